@@ -0,0 +1,131 @@
+"""
+Benchmark of the dispatch of i3bar click events.
+
+It feeds 20000 click events spread over 500 loaded modules to the Events
+thread and reports how many events per second reach the on_click of their
+module. The modules are stubs, only the dispatch itself is measured.
+
+Usage:
+    python bench/click_events.py [py3status tree]
+
+The tree defaults to the one holding this script, compare with another
+checkout such as one from 'git worktree add'.
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+from threading import Event, Thread
+
+EVENTS = 20000
+MODULES = 500
+
+tree = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+if len(sys.argv) > 1:
+    tree = sys.argv[1]
+sys.path.insert(0, os.path.abspath(tree))
+
+# the Events thread reads the click events from stdin
+read_fd, write_fd = os.pipe()
+sys.stdin = os.fdopen(read_fd, 'rb')
+
+import py3status  # noqa
+
+clicks = [0]
+
+
+class Scheduler:
+    """
+    Run the submitted jobs right away.
+    """
+    def submit(self, job):
+        job()
+
+
+class Logger:
+    """
+    Drop the messages.
+    """
+    def log(self, *args, **kwargs):
+        pass
+
+
+class Wrapper:
+    """
+    The parts of Py3statusWrapper used by the Events thread.
+    """
+    logger = Logger()
+    scheduler = Scheduler()
+
+    def notify_update(self):
+        pass
+
+    def refresh_modules(self, module_names=None):
+        pass
+
+
+class Module:
+    """
+    A loaded module with a single method accepting click events.
+    """
+    click_events = True
+
+    def __init__(self, index):
+        self.module_name = 'stub'
+        self.module_inst = str(index)
+        self.module_full_name = 'stub {}'.format(index)
+        self.methods = {
+            'stub': {
+                'cached_until': 0,
+                'instance': str(index),
+                'method': 'stub',
+                'name': 'stub'
+            }
+        }
+
+    def click_event(self, event):
+        clicks[0] += 1
+
+
+def main():
+    lock = Event()
+    lock.set()
+    modules = dict(
+        (module.module_full_name, module)
+        for module in (Module(i) for i in range(MODULES))
+    )
+    args = [lock, {'debug': False}, modules, {'on_click': {}}]
+    if hasattr(py3status.Events, 'register_module'):
+        events = py3status.Events(*args + [Wrapper()])
+        for module in modules.values():
+            events.register_module(module)
+    else:
+        events = py3status.Events(*args)
+    events.daemon = True
+
+    payload = b'[\n' + b''.join(
+        '{{"name":"stub","instance":"{}","button":1}}\n,'.format(
+            i % MODULES
+        ).encode()
+        for i in range(EVENTS)
+    )
+
+    def write():
+        with os.fdopen(write_fd, 'wb') as f:
+            f.write(payload)
+
+    events.start()
+    started = time.time()
+    writer = Thread(target=write)
+    writer.daemon = True
+    writer.start()
+    while clicks[0] < EVENTS:
+        time.sleep(0.001)
+    duration = time.time() - started
+    print('{} modules: {:.0f} events/s'.format(MODULES, EVENTS / duration))
+
+
+if __name__ == '__main__':
+    main()
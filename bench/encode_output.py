@@ -0,0 +1,86 @@
+"""
+Micro-benchmark of the encoding of the bar lines py3status prints.
+
+It compares the former encoding of each update (dumps of the whole bar
+plus the deepcopy kept to detect changes) to Py3statusWrapper.encode_output
+which only re-encodes the blocks which changed. The bar has 40 blocks, the
+last one being a clock changing on every update.
+
+Usage:
+    python bench/encode_output.py [py3status tree]
+
+The tree defaults to the one holding this script.
+"""
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+from copy import deepcopy
+from json import dumps
+
+BLOCKS = 40
+NUMBER = 2000
+
+tree = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+if len(sys.argv) > 1:
+    tree = sys.argv[1]
+sys.path.insert(0, os.path.abspath(tree))
+
+from py3status import Py3statusWrapper  # noqa
+
+blocks = [
+    {
+        'color': '#00FF00',
+        'full_text': 'value {}'.format(i),
+        'instance': 'i{}'.format(i),
+        'name': 'mod{}'.format(i),
+        'separator': True
+    }
+    for i in range(BLOCKS)
+]
+ticks = [0]
+
+
+def tick():
+    """
+    Return the bar with its clock block updated.
+    """
+    ticks[0] += 1
+    blocks[-1] = dict(
+        blocks[-1],
+        full_text='12:00:{:02d}'.format(ticks[0] % 60)
+    )
+    return blocks
+
+
+previous = [None]
+
+
+def dumps_line():
+    """
+    Encode the whole bar when it changed, as py3status used to.
+    """
+    json_list = tick()
+    if json_list != previous[0]:
+        line = ',{}'.format(dumps(json_list))
+        previous[0] = deepcopy(json_list)
+        return line
+
+
+wrapper = Py3statusWrapper()
+
+
+def encode_line():
+    """
+    Encode the bar reusing the fragments of the unchanged blocks.
+    """
+    return ',{}'.format(wrapper.encode_output(tick()))
+
+
+for func in (dumps_line, encode_line):
+    duration = min(timeit.repeat(func, number=NUMBER, repeat=5)) / NUMBER
+    print('{:<12} {:6.1f} us/line {:8.0f} lines/s'.format(
+        func.__name__, duration * 1e6, 1 / duration
+    ))
@@ -0,0 +1,113 @@
+"""
+Benchmark of the cost of idle modules.
+
+It runs py3status with 5, 50 then 500 instances of a module refreshing every
+minute and reports, once started, its number of threads, its wake ups per
+second (context switches of all its threads) and its resident memory.
+Linux only, the figures are read from /proc.
+
+Usage:
+    python bench/scheduler.py [py3status tree] [modules count...]
+
+The tree defaults to the one holding this script, compare with another
+checkout such as one from 'git worktree add'.
+"""
+from __future__ import print_function
+
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+MODULE = """from time import time
+
+
+class Py3status:
+    def idle(self, i3s_output_list, i3s_config):
+        return {'full_text': 'idle', 'cached_until': time() + 60}
+"""
+
+# seconds given to py3status to start, then to measure its wake ups
+STARTUP = 4
+DURATION = 5
+
+
+def get_context_switches(pid):
+    """
+    Return the number of context switches of all the threads of a process.
+    """
+    switches = 0
+    for status in glob.glob('/proc/{}/task/*/status'.format(pid)):
+        with open(status) as f:
+            for line in f:
+                if 'ctxt_switches' in line:
+                    switches += int(line.split()[1])
+    return switches
+
+
+def get_rss(pid):
+    """
+    Return the resident memory of a process in kB.
+    """
+    with open('/proc/{}/status'.format(pid)) as f:
+        for line in f:
+            if line.startswith('VmRSS'):
+                return int(line.split()[1])
+
+
+def measure(tree, modules, tmp_dir):
+    """
+    Run py3status with the given number of modules and print its figures.
+    """
+    config = os.path.join(tmp_dir, 'i3status.conf')
+    with open(config, 'w') as f:
+        f.write('general {\n    interval = 5\n}\n')
+        for i in range(modules):
+            f.write('order += "idle {}"\n'.format(i))
+    with open(os.devnull, 'w') as devnull:
+        process = subprocess.Popen(
+            [
+                sys.executable, '-c',
+                'import sys; sys.path.insert(0, {!r}); '
+                'from py3status import main; main()'.format(tree),
+                '-s', '-c', config, '-i', tmp_dir
+            ],
+            stdin=subprocess.PIPE,
+            stdout=devnull
+        )
+    try:
+        time.sleep(STARTUP)
+        before = get_context_switches(process.pid)
+        time.sleep(DURATION)
+        wakeups = (get_context_switches(process.pid) - before) / DURATION
+        threads = len(os.listdir('/proc/{}/task'.format(process.pid)))
+        print('{:>4} modules: {:>4} threads {:8.1f} wakeups/s {:>7} kB'.format(
+            modules, threads, wakeups, get_rss(process.pid)
+        ))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    tree = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+    counts = [5, 50, 500]
+    if len(sys.argv) > 1:
+        tree = sys.argv[1]
+    if len(sys.argv) > 2:
+        counts = [int(count) for count in sys.argv[2:]]
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(tmp_dir, 'idle.py'), 'w') as f:
+            f.write(MODULE)
+        for modules in counts:
+            measure(os.path.abspath(tree), modules, tmp_dir)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,6 +12,41 @@
 #     - 'kill' method for py3status exit notification
 #     - 'on_click' method for click events from i3bar (read below please)
 #
+# NOTE: on python3.5+, methods can be written as coroutines (async def) and
+# will then be run on an event loop shared by all modules. They are cancelled
+# after 'method_timeout' seconds (default 30) which you can also set from the
+# module's i3status config section.
+#
+# NOTE: CPU heavy modules can be run in their own worker process by setting
+# 'executor = "process"' in their i3status config section. The worker is
+# restarted when it crashes or when it uses more than 'executor_max_rss' MB
+# (default 256) or has served 'executor_max_calls' calls (default 0, never).
+#
+# NOTE: modules are loaded concurrently at startup. Most modules are only
+# imported and instantiated on their first run. Those whose methods can only be
+# known by importing them (inherited or decorated methods) and those run in a
+# worker process are imported and instantiated at startup: when this takes more
+# than 'init_timeout' seconds (default 10) the module is given up on, you can
+# set it from the module's i3status config section.
+#
+# NOTE: the other methods, including 'on_click', are watched by the same
+# 'method_timeout'. A call running for longer is reported to syslog and the
+# last output of the method is shown with the 'stale_indicator' suffix
+# (default ' (stale)') in the degraded color until the method returns.
+#
+# NOTE: a method raising an exception is retried after the interval, then
+# after twice as long on each consecutive failure up to 'retry_max' seconds
+# (default 300). Refreshes longer than the interval are randomly delayed by
+# up to 'refresh_jitter' of their period (default 0.1, 0 to disable, 1 at
+# most) so that modules do not all run at once. Both can be set from the
+# module's i3status config section.
+#
+# NOTE: the refresh interval of a module is multiplied by 'battery_factor'
+# while running on battery and by 'power_factor' while the display is off or
+# locked (see py3status -h). A module which must refresh at full rate, like a
+# clock, can set them to 1 as class attributes or in its i3status config
+# section.
+#
 # WARNING:
 #
 # Do NOT use print on your modules: py3status will catch any output and discard
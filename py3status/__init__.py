@@ -2,53 +2,102 @@ from __future__ import print_function
 
 import argparse
 import ast
-import cProfile
+import errno
 import imp
 import locale
 import os
+import re
 import select
+import socket
+import struct
 import sys
 
-from collections import OrderedDict
+from collections import deque, OrderedDict
 from contextlib import contextmanager
-from copy import deepcopy
 from datetime import datetime
+from fcntl import fcntl, F_GETFL, F_SETFL
+from hashlib import sha1
+from heapq import heappop, heappush
 from json import dumps, loads
+from random import uniform
 from signal import signal
-from signal import SIGTERM, SIGUSR1
+from signal import SIGCONT, SIGSTOP, SIGTERM, SIGTSTP, SIGUSR1, SIGUSR2
+from stat import S_IMODE, S_ISDIR
 from subprocess import Popen
 from subprocess import PIPE
-from subprocess import call
-from tempfile import NamedTemporaryFile
-from threading import Event, Thread
+from tempfile import gettempdir, NamedTemporaryFile
+from threading import Condition, Event, Lock, Thread
+from threading import enumerate as threading_enumerate
 from time import sleep, time
 from syslog import syslog, LOG_ERR, LOG_INFO, LOG_WARNING
 
 try:
-    from setproctitle import setproctitle
-    setproctitle('py3status')
+    # python3
+    from queue import Empty, Full, Queue
+    from threading import get_ident
 except ImportError:
-    pass
+    from Queue import Empty, Full, Queue
+    from thread import get_ident
 
-# Used in development
-enable_profiling = False
+try:
+    # python3.7+
+    from time import thread_time
+except ImportError:
+    thread_time = None
 
+try:
+    # python3.5+ modules can implement their methods as coroutines, asyncio
+    # is only imported once one of them runs
+    from inspect import iscoroutine, iscoroutinefunction
+except ImportError:
+    def iscoroutine(obj):
+        return False
 
-def profile(thread_run_fn):
-    if not enable_profiling:
-        return thread_run_fn
+    def iscoroutinefunction(func):
+        return False
 
-    def wrapper_run(self):
-        """Wrap the Thread.run() method
-        """
-        profiler = cProfile.Profile()
-        try:
-            return profiler.runcall(thread_run_fn, self)
-        finally:
-            thread_id = getattr(self, 'ident', 'core')
-            profiler.dump_stats("py3status-%s.profile" % thread_id)
+try:
+    from setproctitle import setproctitle
+    setproctitle('py3status')
+except ImportError:
+    pass
 
-    return wrapper_run
+# i3status config tokenizer, parameter values are read up to the end of line
+CONFIG_TOKEN = re.compile(r"""
+    (?P<space>[ \t\r\n]+)
+    |(?P<comment>\#[^\n]*)
+    |(?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+    |(?P<assign>\+?=)
+    |(?P<open>\{)
+    |(?P<close>\})
+    |(?P<word>(?:[^\s{}="'\#+]|\+(?!=))+|["'\#])
+""", re.VERBOSE)
+CONFIG_STRING = re.compile(r"""^(?:"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')$""")
+CONFIG_STRING_PREFIX = re.compile(
+    r"""^(?:"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')"""
+)
+CONFIG_INTEGER = re.compile(r'^-?[0-9]+$')
+CONFIG_ESCAPE = re.compile(r'\\(.)')
+CONFIG_ESCAPES = {'n': '\n', 't': '\t', '\\': '\\', '"': '"', "'": "'"}
+
+# bump this when the parsed config format changes to invalidate the caches
+CONFIG_CACHE_VERSION = 2
+STATE_VERSION = 1
+
+# inotify IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE events of a directory
+INOTIFY_DIR_MASK = 0x00000008 | 0x00000080 | 0x00000100
+# inotify IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_DELETE_SELF |
+# IN_MOVE_SELF events of a file
+INOTIFY_FILE_MASK = (
+    0x00000002 | 0x00000004 | 0x00000008 | 0x00000400 | 0x00000800
+)
+
+# settings multiplying the refresh interval of a module, see Scheduler
+FACTOR_SETTINGS = ('battery_factor', 'power_factor')
+
+# longest wait of the main loop for an update: Python 2 does not run signal
+# handlers during an endless wait while a finite one polls, so keep it short
+MAX_WAIT = 1 if sys.version_info < (3, 0) else 60
 
 
 @contextmanager
@@ -62,12 +111,23 @@ def jsonify(string):
     yield (prefix, loads(string))
 
 
-def print_line(line):
+def placeholder(module_name):
+    """
+    Return the block displayed for the given module until its first output.
+    """
+    name = module_name.split(' ')[0]
+    instance = ''.join(module_name.split(' ')[1:])
+    return {'full_text': '...', 'instance': instance, 'name': name}
+
+
+def positive_float(value):
     """
-    Print given line to stdout (i3bar).
+    Argument type of the command line options taking a factor.
     """
-    sys.__stdout__.write('{}\n'.format(line))
-    sys.__stdout__.flush()
+    value = float(value)
+    if value <= 0:
+        raise argparse.ArgumentTypeError('should be positive')
+    return value
 
 
 def print_stderr(line):
@@ -78,47 +138,87 @@ def print_stderr(line):
 
 class IOPoller:
     """
-    This class implements a predictive and timing-out I/O reader
-    using select and the poll() mechanism for greater compatibility.
+    This class implements a non-blocking line reader on top of the poll()
+    mechanism: whatever bytes are available are read at once into a buffer
+    which is then split on complete lines, partial lines being kept until
+    they are completed.
     """
     def __init__(self, io, eventmask=select.POLLIN):
         """
         Our default is to read (POLLIN) the specified 'io' file descriptor.
         """
+        self.buffer = b''
+        self.closed = False
+        self.fd = io.fileno()
         self.io = io
+        self.lines = deque()
         self.poller = select.poll()
-        self.poller.register(io, eventmask)
+        self.poller.register(self.fd, eventmask)
+        flags = fcntl(self.fd, F_GETFL)
+        fcntl(self.fd, F_SETFL, flags | os.O_NONBLOCK)
+
+    def read(self):
+        """
+        Read everything available on our file descriptor without blocking
+        and queue the complete lines found.
+        """
+        while True:
+            try:
+                chunk = os.read(self.fd, 65536)
+            except OSError:
+                err = sys.exc_info()[1]
+                if err.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+            if not chunk:
+                self.closed = True
+                break
+            self.buffer += chunk
+        lines = self.buffer.split(b'\n')
+        self.buffer = lines.pop()
+        self.lines.extend(lines)
 
     def readline(self, timeout=0.5):
         """
-        Try to read our I/O for 'timeout' seconds, return None otherwise.
+        Return the next complete line, waiting up to 'timeout' seconds for
+        one to arrive (forever if timeout is None), return None otherwise.
         This makes calling and reading I/O non blocking !
         """
-        poll_result = self.poller.poll(timeout)
-        if poll_result:
-            line = self.io.readline().strip()
-            if self.io == sys.stdin and line == '[':
-                # skip first event line wrt issue #19
-                line = self.io.readline().strip()
-            try:
-                # python3 compatibility code
-                line = line.decode()
-            except (AttributeError, UnicodeDecodeError):
-                pass
-            return line
-        else:
-            return None
+        if timeout is not None:
+            deadline = time() + timeout
+        while not self.lines:
+            if self.closed:
+                return None
+            if timeout is None:
+                poll_timeout = None
+            else:
+                poll_timeout = max(deadline - time(), 0) * 1000
+            if not self.poller.poll(poll_timeout) and timeout is not None:
+                return None
+            self.read()
+        line = self.lines.popleft().strip()
+        if self.io == sys.stdin and line == b'[':
+            # skip first event line wrt issue #19
+            return self.readline(timeout)
+        try:
+            # python3 compatibility code
+            line = line.decode()
+        except (AttributeError, UnicodeDecodeError):
+            pass
+        return line
 
 
 class I3status(Thread):
     """
     This class is responsible for spawning i3status and reading its output.
     """
-    def __init__(self, lock, i3status_config_path, standalone):
+    def __init__(self, lock, i3status_config_path, standalone, py3_wrapper):
         """
         Our output will be read asynchronously from 'last_output'.
         """
-        Thread.__init__(self)
+        Thread.__init__(self, name='i3status')
+        # we block on i3status output, do not prevent py3status from exiting
+        self.daemon = True
         self.error = None
         self.i3status_module_names = [
             'battery',
@@ -136,17 +236,21 @@ class I3status(Thread):
             'volume',
             'wireless'
         ]
+        self.i3status_pipe = None
         self.json_list = None
-        self.json_list_ts = None
         self.last_output = None
         self.last_output_ts = None
-        self.last_prefix = None
         self.lock = lock
+        self.placeholders = {}
+        self.py3_wrapper = py3_wrapper
         self.ready = False
         self.standalone = standalone
+        self.stopped = False
         self.tmpfile_path = None
         #
         self.config = self.i3status_config_reader(i3status_config_path)
+        # the i3status part of the config we spawn i3status with
+        self.config_text = self.get_i3status_config_text(self.config)
 
     def valid_config_param(self, param_name, cleanup=False):
         """
@@ -163,50 +267,213 @@ class I3status(Thread):
         return param_name.split(' ')[0] in valid_config_params
 
     @staticmethod
-    def eval_config_parameter(param):
+    def unquote_config_token(token):
         """
-        Try to evaluate the given parameter as a string or integer and return
-        it properly. This is used to parse i3status configuration parameters
-        such as 'disk "/home" {}' or worse like '"cpu_temperature" 0 {}'.
+        Return the content of the given quoted string token, handling the
+        escaping of quotes and backslashes.
         """
-        params = param.split(' ')
-        result_list = list()
+        content = token[1:-1]
+        if '\\' in content:
+            content = CONFIG_ESCAPE.sub(
+                lambda m: CONFIG_ESCAPES.get(m.group(1), m.group(0)),
+                content
+            )
+        return content
 
-        for p in params:
-            try:
-                e_value = eval(p)
-                if isinstance(e_value, str) or isinstance(e_value, int):
-                    p = str(e_value)
+    def config_parameter(self, tokens):
+        """
+        Return the section name or parameter key made of the given tokens,
+        quoted strings being unquoted. This is used to parse i3status
+        configuration parameters such as 'disk "/home" {}' or worse like
+        '"cpu_temperature" 0 {}'.
+        """
+        return ' '.join(
+            self.unquote_config_token(token)
+            if token[0] in '"\'' else token
+            for token in tokens
+        )
+
+    @staticmethod
+    def strip_config_comment(value):
+        """
+        Return the given raw value without its trailing comment: like
+        i3status, a '#' starts a comment right after a complete quoted
+        value or after a space, so that colors such as '#FF0000' are kept.
+        """
+        match = CONFIG_STRING_PREFIX.match(value)
+        start = match.end() if match else 0
+        rest = value[start:]
+        if match and rest.lstrip(' \t').startswith('#'):
+            return value[:start]
+        comment = re.search(r'[ \t]#', rest)
+        if comment:
+            return (value[:start] + rest[:comment.start()]).rstrip(' \t')
+        return value
+
+    def config_value(self, value):
+        """
+        Return the given raw value as a string if it is quoted, as an
+        integer if it is one, as is otherwise.
+        """
+        if CONFIG_STRING.match(value):
+            return self.unquote_config_token(value)
+        if CONFIG_INTEGER.match(value):
+            return int(value)
+        if value in ('True', 'False'):
+            return value == 'True'
+        return value
+
+    def tokenize_config(self, text):
+        """
+        Tokenize the given i3status configuration text in a single pass and
+        yield its statements as tuples:
+            - ('section', name) when a section starts
+            - ('end', None) when a section ends
+            - ('param', key, value) for parameters
+            - ('order', value) for order += directives
+
+        Parameter values span to the end of their line (minus their trailing
+        comment and the closing brace of one-liner sections) so that unquoted
+        values such as colors or time formats are kept as is.
+        """
+        pos = 0
+        end = len(text)
+        words = []
+        in_section = False
+        while pos < end:
+            match = CONFIG_TOKEN.match(text, pos)
+            pos = match.end()
+            kind = match.lastgroup
+            token = match.group(kind)
+            if kind == 'comment':
+                # comments are only allowed at the start of a line
+                if words:
+                    words.append(token)
                 else:
-                    raise ValueError()
-            except (NameError, SyntaxError, ValueError):
-                pass
-            finally:
-                result_list.append(p)
+                    pos = text.find('\n', pos)
+                    pos = end if pos == -1 else pos
+            elif kind in ('string', 'word'):
+                words.append(token)
+            elif kind == 'open':
+                in_section = True
+                yield ('section', self.config_parameter(words))
+                words = []
+            elif kind == 'close':
+                in_section = False
+                words = []
+                yield ('end', None)
+            elif kind == 'assign':
+                line_end = text.find('\n', pos)
+                line_end = end if line_end == -1 else line_end
+                value = text[pos:line_end].strip(' \t\r')
+                value = self.strip_config_comment(value)
+                pos = line_end
+                closing = in_section and value.endswith('}')
+                if closing:
+                    value = value[:-1].strip(' \t\r')
+                key = self.config_parameter(words)
+                words = []
+                if key == 'order':
+                    yield ('order', self.config_value(value))
+                else:
+                    yield ('param', key, self.config_value(value))
+                if closing:
+                    in_section = False
+                    yield ('end', None)
+            # newlines and spaces separate tokens, a section name can be
+            # followed by its opening brace on the next line
+
+    def i3status_config_reader(self, i3status_config_path):
+        """
+        Parse i3status.conf so we can adapt our code to the i3status config.
 
-        return ' '.join(result_list)
+        The result is cached on disk along with the size and modification
+        time of the file so that restarts do not parse it again.
+        """
+        try:
+            stat = os.stat(i3status_config_path)
+        except OSError:
+            stat = None
+        config = self.load_config_cache(i3status_config_path, stat)
+        if config is None:
+            config = self.parse_i3status_config(i3status_config_path)
+            self.save_config_cache(i3status_config_path, stat, config)
+        return config
 
     @staticmethod
-    def eval_config_value(value):
+    def get_config_cache_path(i3status_config_path, kind='config'):
+        """
+        Return the path of the given kind of cache file of the given config
+        file, either its parsed 'config' or the modules' 'state'.
+        """
+        cache_dir = os.environ.get(
+            'XDG_CACHE_HOME',
+            os.path.join(os.path.expanduser('~'), '.cache')
+        )
+        config_path = os.path.abspath(i3status_config_path)
+        digest = sha1(config_path.encode()).hexdigest()
+        return os.path.join(
+            cache_dir, 'py3status', '{}-{}.json'.format(kind, digest)
+        )
+
+    def load_config_cache(self, i3status_config_path, stat):
         """
-        Try to evaluate the given parameter as a string or integer and return
-        it properly. This is used to parse i3status configuration parameters
-        such as 'disk "/home" {}' or worse like '"cpu_temperature" 0 {}'.
+        Return the cached parsed config of the given file if it is still
+        valid for the given stat of the file, None otherwise.
         """
+        if stat is None:
+            return None
         try:
-            e_value = eval(value)
-            if isinstance(e_value, str) or isinstance(e_value, int):
-                value = e_value
-            else:
-                raise ValueError()
-        except (NameError, ValueError):
-            pass
-        finally:
-            return value
+            with open(self.get_config_cache_path(i3status_config_path)) as f:
+                cache = loads(f.read())
+            if (
+                cache['version'] != CONFIG_CACHE_VERSION or
+                cache['path'] != os.path.abspath(i3status_config_path) or
+                cache['size'] != stat.st_size or
+                cache['mtime'] != stat.st_mtime
+            ):
+                return None
+            config = cache['config']
+        except Exception:
+            return None
+        # JSON turned the on_click button ids into strings
+        for section_name, buttons in config['on_click'].items():
+            config['on_click'][section_name] = dict(
+                (int(button), command) for button, command in buttons.items()
+            )
+        return config
 
-    def i3status_config_reader(self, i3status_config_path):
+    def save_config_cache(self, i3status_config_path, stat, config):
         """
-        Parse i3status.conf so we can adapt our code to the i3status config.
+        Save the given parsed config of the given file on disk.
+        """
+        if stat is None:
+            return
+        cache_path = self.get_config_cache_path(i3status_config_path)
+        cache = {
+            'config': config,
+            'mtime': stat.st_mtime,
+            'path': os.path.abspath(i3status_config_path),
+            'size': stat.st_size,
+            'version': CONFIG_CACHE_VERSION
+        }
+        try:
+            if not os.path.isdir(os.path.dirname(cache_path)):
+                os.makedirs(os.path.dirname(cache_path))
+            # write then rename so that a concurrent reader never sees a
+            # partially written cache
+            with NamedTemporaryFile(
+                'w', dir=os.path.dirname(cache_path), delete=False
+            ) as f:
+                f.write(dumps(cache))
+            os.rename(f.name, cache_path)
+        except Exception:
+            err = sys.exc_info()[1]
+            syslog(LOG_WARNING, 'unable to cache config ({})'.format(err))
+
+    def parse_i3status_config(self, i3status_config_path):
+        """
+        Parse the given i3status.conf file.
         """
         config = {
             'general': {
@@ -224,92 +491,56 @@ class I3status(Thread):
             'py3_modules': []
         }
 
-        # some ugly parsing
-        in_section = False
-        section_name = ''
-
-        for line in open(i3status_config_path, 'r'):
-            line = line.strip(' \t\n\r')
+        with open(i3status_config_path, 'r') as f:
+            text = f.read()
 
-            if not line or line.startswith('#'):
-                continue
+        section_name = ''
+        for statement in self.tokenize_config(text):
+            if statement[0] == 'section':
+                section_name = statement[1]
+                if section_name not in config:
+                    config[section_name] = {}
+            elif statement[0] == 'end':
+                section_name = ''
+            elif statement[0] == 'order':
+                value = statement[1]
+                config['order'].append(value)
 
-            if line.startswith('order'):
-                in_section = True
-                section_name = 'order'
+                # create an empty config for this module
+                if value not in config:
+                    config[value] = {}
 
-            if not in_section:
-                section_name = line.split('{')[0].strip()
-                section_name = self.eval_config_parameter(section_name)
-                if not section_name:
-                    continue
+                # detect internal modules to be loaded dynamically
+                if not self.valid_config_param(value):
+                    config['py3_modules'].append(value)
                 else:
-                    in_section = True
-                    if section_name not in config:
-                        config[section_name] = {}
-
-            if '{' in line:
-                in_section = True
-
-            if section_name and '=' in line:
-                section_line = line
-
-                # one liner cases
-                if line.endswith('}'):
-                    section_line = section_line.split('}', -1)[0].strip()
-                if line.startswith(section_name + ' {'):
-                    section_line = section_line.split(
-                        section_name + ' {'
-                    )[1].strip()
-
-                key = section_line.split('=')[0].strip()
-                key = self.eval_config_parameter(key)
-
-                value = section_line.split('=')[1].strip()
-                value = self.eval_config_value(value)
-
-                if section_name == 'order':
-                    config[section_name].append(value)
-                    line = '}'
-
-                    # create an empty config for this module
-                    if value not in config:
-                        config[value] = {}
-
-                    # detect internal modules to be loaded dynamically
-                    if not self.valid_config_param(value):
-                        config['py3_modules'].append(value)
-                    else:
-                        config['i3s_modules'].append(value)
+                    config['i3s_modules'].append(value)
+            elif section_name:
+                key, value = statement[1:]
+                if not key.startswith('on_click'):
+                    config[section_name][key] = value
                 else:
-                    if not key.startswith('on_click'):
-                        config[section_name][key] = value
-                    else:
-                        # on_click special parameters
-                        try:
-                            button = int(key.split()[1])
-                            if button not in range(1, 6):
-                                raise ValueError(
-                                    'should be 1, 2, 3, 4 or 5'
-                                )
-                        except IndexError as e:
-                            raise IndexError(
-                                'missing "button id" for "on_click" '
-                                'parameter in section {}'.format(section_name)
-                            )
-                        except ValueError as e:
+                    # on_click special parameters
+                    try:
+                        button = int(key.split()[1])
+                        if button not in range(1, 6):
                             raise ValueError(
-                                'invalid "button id" '
-                                'for "on_click" parameter '
-                                'in section {} ({})'.format(section_name, e)
+                                'should be 1, 2, 3, 4 or 5'
                             )
-                        on_c = config['on_click']
-                        on_c[section_name] = on_c.get(section_name, {})
-                        on_c[section_name][button] = value
-
-            if line.endswith('}'):
-                in_section = False
-                section_name = ''
+                    except IndexError as e:
+                        raise IndexError(
+                            'missing "button id" for "on_click" '
+                            'parameter in section {}'.format(section_name)
+                        )
+                    except ValueError as e:
+                        raise ValueError(
+                            'invalid "button id" '
+                            'for "on_click" parameter '
+                            'in section {} ({})'.format(section_name, e)
+                        )
+                    on_c = config['on_click']
+                    on_c[section_name] = on_c.get(section_name, {})
+                    on_c[section_name][button] = value
 
         # py3status only uses the i3bar protocol because it needs JSON output
         if config['general']['output_format'] != 'i3bar':
@@ -326,7 +557,7 @@ class I3status(Thread):
             )
 
         # cleanup unconfigured i3status modules that have no default
-        for module_name in deepcopy(config['order']):
+        for module_name in list(config['order']):
             if (self.valid_config_param(module_name, cleanup=True) and
                 not config.get(module_name)):
                 config.pop(module_name)
@@ -339,7 +570,7 @@ class I3status(Thread):
         """
         Set the given i3status responses on their respective configuration.
         """
-        for index, item in enumerate(self.json_list):
+        for index, item in enumerate(json_list):
             conf_name = self.config['i3s_modules'][index]
             self.config[conf_name]['response'] = item
 
@@ -414,8 +645,9 @@ class I3status(Thread):
 
     def tick_time_modules(self, json_list, force):
         """
-        Adjust the 'time' and 'tztime' objects from the given json_list so that
-        they are updated only at py3status interval seconds.
+        Return a copy of the given json_list with the 'time' and 'tztime'
+        objects adjusted so that they are updated only at py3status interval
+        seconds. The given json_list and its blocks are left untouched.
 
         This method is used to overwrite any i3status time or tztime output
         with respect to their parsed and timezone offset detected on start.
@@ -426,6 +658,7 @@ class I3status(Thread):
         if utcnow.second == 0:
             self.set_time_modules()
         #
+        json_list = list(json_list)
         for index, item in enumerate(json_list):
             if item.get('name') in ['time', 'tztime']:
                 conf_name = self.config['i3s_modules'][index]
@@ -437,37 +670,71 @@ class I3status(Thread):
                     date = time_module['date']
                 time_format = self.config[conf_name].get('time_format')
 
-                # set the full_text date on the json_list to be returned
-                item['full_text'] = date.strftime(time_format)
-                json_list[index] = item
-
-                # reset the full_text date on the config object for next
-                # iteration to be consistent with this one
-                time_module['response']['full_text'] = item['full_text']
+                # set a new block with the full_text date on the json_list to
+                # be returned, unless it did not change since last iteration
+                full_text = date.strftime(time_format)
+                if (
+                    time_module.get('source') is not item or
+                    time_module['response']['full_text'] != full_text
+                ):
+                    time_module['response'] = dict(
+                        item,
+                        full_text=full_text
+                    )
+                    time_module['source'] = item
+                json_list[index] = time_module['response']
         return json_list
 
+    def has_time_modules(self):
+        """
+        Return True if any 'time' or 'tztime' module is configured, the main
+        loop needs to tick them every interval even when nothing else changes.
+        """
+        for module_name in self.config['i3s_modules']:
+            if module_name.split(' ')[0] in ['time', 'tztime']:
+                return True
+        return False
+
     def update_json_list(self):
         """
-        Copy the last json list output from i3status so that any module
-        can modify it without altering the original output.
-        This is done so that any module's alteration of a i3status output json
-        will not be overwritten when the next i3status output gets polled.
+        Publish the last json list output from i3status.
+
+        The i3status output is never modified once parsed: modules get their
+        own copy of it (see get_json_list) and the time modules are ticked
+        on new blocks. Publishing it is thus a simple reference assignment
+        and no copy happens on the main loop.
+        """
+        self.json_list = self.last_output
+
+    def get_json_list(self):
+        """
+        Return a copy of the last i3status output for a module to use. As
+        blocks only hold scalar values, a shallow copy of each of them is
+        enough to keep a module from altering the shared output.
+        The list is empty until i3status is ready.
         """
-        self.json_list = deepcopy(self.last_output)
-        self.json_list_ts = deepcopy(self.last_output_ts)
+        return [dict(item) for item in self.json_list or []]
 
-    def get_modules_output(self, json_list, py3_modules):
+    def get_modules_output(self, json_list, py3_modules, loading=()):
         """
         Return the final json list to be displayed on the i3bar by taking
         into account every py3status configured module and i3status'.
         Simply put, this method honors the initial 'order' configured by
         the user in his i3status.conf.
+        The given loading py3status modules and i3status' until it is ready
+        are displayed as placeholders.
         """
         ordered = []
         for module_name in self.config['order']:
             if module_name in py3_modules:
                 for method in py3_modules[module_name].methods.values():
                     ordered.append(method['last_output'])
+            elif module_name in loading or (
+                not self.ready and module_name in self.config['i3s_modules']
+            ):
+                if module_name not in self.placeholders:
+                    self.placeholders[module_name] = placeholder(module_name)
+                ordered.append(self.placeholders[module_name])
             else:
                 if self.config.get(module_name, {}).get('response'):
                     ordered.append(self.config[module_name]['response'])
@@ -483,33 +750,35 @@ class I3status(Thread):
         except TypeError:
             tmpfile.write(str.encode(text))
 
-    def write_tmp_i3status_config(self, tmpfile):
+    def get_i3status_config_text(self, config):
         """
-        Given a temporary file descriptor, write a valid i3status config file
-        based on the parsed one from 'i3status_config_path'.
+        Return a valid i3status config file content based on the given
+        parsed config, only i3status' own sections are kept.
         """
-        for section_name, conf in sorted(self.config.items()):
+        text = ''
+        for section_name, conf in sorted(config.items()):
             if section_name in ['i3s_modules', 'py3_modules']:
                 continue
             elif section_name == 'order':
                 for module_name in conf:
                     if self.valid_config_param(module_name):
-                        self.write_in_tmpfile(
-                            'order += "%s"\n' % module_name,
-                            tmpfile
-                        )
-                self.write_in_tmpfile('\n', tmpfile)
+                        text += 'order += "%s"\n' % module_name
+                text += '\n'
             elif self.valid_config_param(section_name) and conf:
-                self.write_in_tmpfile('%s {\n' % section_name, tmpfile)
-                for key, value in conf.items():
-                    self.write_in_tmpfile(
-                        '    %s = "%s"\n' % (key, value),
-                        tmpfile
-                    )
-                self.write_in_tmpfile('}\n\n', tmpfile)
+                text += '%s {\n' % section_name
+                for key, value in sorted(conf.items()):
+                    text += '    %s = "%s"\n' % (key, value)
+                text += '}\n\n'
+        return text
+
+    def write_tmp_i3status_config(self, tmpfile):
+        """
+        Given a temporary file descriptor, write a valid i3status config file
+        based on the parsed one from 'i3status_config_path'.
+        """
+        self.write_in_tmpfile(self.config_text, tmpfile)
         tmpfile.flush()
 
-    @profile
     def run(self):
         """
         Spawn i3status using a self generated config file and poll its output.
@@ -529,58 +798,48 @@ class I3status(Thread):
                     stdout=PIPE,
                     stderr=PIPE,
                 )
+                self.i3status_pipe = i3status_pipe
                 self.poller_inp = IOPoller(i3status_pipe.stdout)
                 self.poller_err = IOPoller(i3status_pipe.stderr)
                 self.tmpfile_path = tmpfile.name
 
                 try:
-                    # at first, poll very quickly
-                    # to avoid delay in first i3bar display
-                    timeout = 0.001
-
-                    # loop on i3status output
-                    while self.lock.is_set():
-                        line = self.poller_inp.readline(timeout)
+                    # loop on i3status output, we block until it prints
+                    # something so its updates reach i3bar immediately
+                    while self.lock.is_set() and not self.stopped:
+                        line = self.poller_inp.readline(timeout=None)
                         if line:
                             if line.startswith('[{'):
-                                print_line(line)
                                 with jsonify(line) as (prefix, json_list):
                                     self.last_output = json_list
                                     self.last_output_ts = datetime.utcnow()
-                                    self.last_prefix = ','
                                     self.update_json_list()
                                     self.set_responses(json_list)
                                     # on first i3status output, we parse
                                     # the time and tztime modules
                                     self.set_time_modules()
                                 self.ready = True
+                                self.py3_wrapper.notify_update()
                             elif not line.startswith(','):
-                                if 'version' in line:
-                                    header = loads(line)
-                                    header.update({'click_events': True})
-                                    line = dumps(header)
-                                print_line(line)
+                                # the i3bar protocol header is ours
+                                continue
                             else:
-                                timeout = 0.5
                                 with jsonify(line) as (prefix, json_list):
                                     self.last_output = json_list
                                     self.last_output_ts = datetime.utcnow()
-                                    self.last_prefix = prefix
                                     self.update_json_list()
                                     self.set_responses(json_list)
-                        else:
-                            err = self.poller_err.readline(timeout)
-                            code = i3status_pipe.poll()
-                            if code is not None:
-                                msg = 'i3status died'
-                                if err:
-                                    msg += ' and said: {}'.format(err)
-                                else:
-                                    msg += ' with code {}'.format(code)
-                                raise IOError(msg)
+                                self.py3_wrapper.notify_update()
+                        elif self.poller_inp.closed:
+                            # i3status closed its output, it is dying
+                            err = self.poller_err.readline(timeout=1)
+                            code = i3status_pipe.wait()
+                            msg = 'i3status died'
+                            if err:
+                                msg += ' and said: {}'.format(err)
                             else:
-                                # poll is CPU intensive, breath a bit
-                                sleep(timeout)
+                                msg += ' with code {}'.format(code)
+                            raise IOError(msg)
                 except IOError:
                     err = sys.exc_info()[1]
                     self.error = err
@@ -588,6 +847,46 @@ class I3status(Thread):
             # we cleanup the tmpfile ourselves so when the delete will occur
             # it will usually raise an OSError: No such file or directory
             pass
+        finally:
+            # wake up the main loop so it notices we are gone
+            self.py3_wrapper.notify_update()
+
+    def refresh(self):
+        """
+        Ask our i3status process to refresh its output, this is what its
+        SIGUSR1 handling is for (see man i3status).
+        """
+        if self.i3status_pipe is not None:
+            try:
+                os.kill(self.i3status_pipe.pid, SIGUSR1)
+            except OSError:
+                pass
+
+    def pause(self, paused):
+        """
+        Stop or continue our i3status process while i3bar is hidden, it is
+        asked for a fresh output when continued.
+        """
+        if self.i3status_pipe is not None:
+            try:
+                os.kill(self.i3status_pipe.pid, SIGSTOP if paused else SIGCONT)
+            except OSError:
+                pass
+        if not paused:
+            self.refresh()
+
+    def stop(self):
+        """
+        Terminate our i3status process, used when it has to be respawned.
+        """
+        self.stopped = True
+        if self.i3status_pipe is not None:
+            try:
+                self.i3status_pipe.terminate()
+                # a stopped process would not handle the termination
+                os.kill(self.i3status_pipe.pid, SIGCONT)
+            except OSError:
+                pass
 
     def cleanup_tmpfile(self):
         """
@@ -603,151 +902,784 @@ class I3status(Thread):
         # mock thread is_alive() method
         self.is_alive = lambda: True
 
-        # mock i3status base output
-        init_output = [
-            '{"click_events": true, "version": 1}',
-            '[',
-            '[]'
-        ]
-        for line in init_output:
-            print_line(line)
-
         # mock i3status output parsing
         self.last_output = []
         self.last_output_ts = datetime.utcnow()
-        self.last_prefix = ','
         self.update_json_list()
+        self.ready = True
 
 
-class Events(Thread):
+class ConfigWatcher(Thread):
     """
-    This class is responsible for dispatching event JSONs sent by the i3bar.
+    This class watches the i3status config file and tells py3status when it
+    changed so that it can be reloaded. It uses inotify when available and
+    falls back to checking the file every few seconds otherwise.
     """
-    def __init__(self, lock, config, modules, i3s_config):
+    def __init__(self, lock, i3status_config_path, py3_wrapper):
         """
-        We need to poll stdin to receive i3bar messages.
+        We watch the file itself, or its directory while it is missing.
         """
-        Thread.__init__(self)
-        self.config = config
-        self.i3s_config = i3s_config
-        self.last_refresh_ts = time()
+        Thread.__init__(self, name='config-watcher')
+        self.daemon = True
         self.lock = lock
-        self.modules = modules
-        self.on_click = i3s_config['on_click']
-        self.poller_inp = IOPoller(sys.stdin)
+        self.path = os.path.realpath(i3status_config_path)
+        self.py3_wrapper = py3_wrapper
 
-    def dispatch(self, module, obj, event):
+    def changed(self):
         """
-        Dispatch the event or enforce the default clear cache action.
+        Tell py3status that the config file changed.
         """
-        module_name = '{} {}'.format(
-            module.module_name,
-            module.module_inst
-        ).strip()
-        #
-        if module.click_events:
-            # module accepts click_events, use it
-            module.click_event(event)
-            if self.config['debug']:
-                syslog(LOG_INFO, 'dispatching event {}'.format(event))
-        else:
-            # default button 2 action is to clear this method's cache
-            if self.config['debug']:
-                syslog(LOG_INFO, 'dispatching default event {}'.format(event))
+        syslog(LOG_INFO, 'config file {} changed'.format(self.path))
+        self.py3_wrapper.config_changed = True
+        self.py3_wrapper.notify_update()
 
-        # to make the bar more responsive to users we ask for a refresh
-        # of the module or of i3status if the module is an i3status one
-        self.refresh(module_name)
+    def get_inode(self):
+        """
+        Return the device and inode of the config file, None if it is
+        missing.
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_dev, stat.st_ino)
 
-    def i3bar_click_events_module(self):
+    def add_watch(self, libc, inotify_fd):
+        """
+        Watch the config file, or its directory while the file is missing so
+        that we notice its creation. Return the watch descriptor and the
+        inode of the watched file, None when watching the directory.
+        """
+        import ctypes
+        while True:
+            wd = libc.inotify_add_watch(
+                inotify_fd, self.path.encode(), INOTIFY_FILE_MASK
+            )
+            if wd >= 0:
+                return wd, self.get_inode()
+            if ctypes.get_errno() != errno.ENOENT:
+                raise OSError(ctypes.get_errno(), 'inotify_add_watch failed')
+            wd = libc.inotify_add_watch(
+                inotify_fd,
+                os.path.dirname(self.path).encode(),
+                INOTIFY_DIR_MASK
+            )
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), 'inotify_add_watch failed')
+            # the file may have been created before we watched its directory
+            if self.get_inode() is None:
+                return wd, None
+            libc.inotify_rm_watch(inotify_fd, wd)
+
+    def watch_inotify(self):
         """
-        Detect the presence of the special i3bar_click_events.py module.
+        Block on inotify events of the config file.
 
-        When py3status detects a module named 'i3bar_click_events.py',
-        it will dispatch i3status click events to this module so you can catch
-        them and trigger any function call based on the event.
+        Editors often replace the file, or move it away then write a new
+        one, so we watch the file found at its path again whenever the
+        watched one is gone.
         """
-        for module in self.modules.values():
-            if not module.click_events:
+        import ctypes
+        from ctypes.util import find_library
+        libc = ctypes.CDLL(find_library('c') or 'libc.so.6', use_errno=True)
+        inotify_fd = libc.inotify_init()
+        if inotify_fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init failed')
+        wd, inode = self.add_watch(libc, inotify_fd)
+        name = os.path.basename(self.path).encode()
+        poller = select.poll()
+        poller.register(inotify_fd, select.POLLIN)
+        changed = False
+        while self.lock.is_set():
+            # once our file changed, wait for the writes to settle down
+            if not poller.poll(200 if changed else None):
+                changed = False
+                self.changed()
                 continue
-            if module.module_name == 'i3bar_click_events.py':
-                return module
-        else:
-            return False
-
-    def refresh(self, module_name):
+            data = os.read(inotify_fd, 4096)
+            offset = 0
+            while offset < len(data):
+                event_wd, _, _, length = struct.unpack_from(
+                    'iIII', data, offset
+                )
+                offset += 16
+                # skip the events of our former watches
+                if event_wd == wd and (
+                    inode is not None or
+                    data[offset:offset + length].rstrip(b'\0') == name
+                ):
+                    changed = True
+                offset += length
+            if changed and self.get_inode() != inode:
+                # the file was replaced, moved, removed or created
+                libc.inotify_rm_watch(inotify_fd, wd)
+                wd, inode = self.add_watch(libc, inotify_fd)
+
+    def watch_stat(self):
         """
-        Force a cache expiration for all the methods of the given module.
-
-        We rate limit the i3status refresh to 100ms.
+        Check the config file modification time every 5 seconds.
         """
-        module = self.modules.get(module_name)
-        if module is not None:
-            if self.config['debug']:
-                syslog(LOG_INFO, 'refresh module {}'.format(module_name))
-            for obj in module.methods.values():
-                obj['cached_until'] = time()
-        else:
-            if time() > (self.last_refresh_ts + 0.1):
-                if self.config['debug']:
-                    syslog(
-                        LOG_INFO,
-                        'refresh i3status for module {}'.format(module_name)
-                    )
-                call(['killall', '-s', 'USR1', 'i3status'])
-                self.last_refresh_ts = time()
+        def get_stat():
+            try:
+                stat = os.stat(self.path)
+                return (stat.st_size, stat.st_mtime)
+            except OSError:
+                return None
+        last_stat = get_stat()
+        while self.lock.is_set():
+            sleep(5)
+            stat = get_stat()
+            if stat != last_stat:
+                last_stat = stat
+                self.changed()
 
-    def refresh_all(self, module_name):
+    def run(self):
         """
-        Force a full refresh of py3status and i3status modules by sending
-        a SIGUSR1 signal to py3status.
-
-        We rate limit this command to 100ms for obvious abusive behavior.
+        Watch the config file.
         """
-        if time() > (self.last_refresh_ts + 0.1):
-            call(['killall', '-s', 'USR1', 'py3status'])
-            self.last_refresh_ts = time()
+        try:
+            self.watch_inotify()
+        except Exception:
+            err = sys.exc_info()[1]
+            syslog(
+                LOG_INFO,
+                'inotify unavailable ({}), checking config file every 5s'
+                .format(err)
+            )
+            self.watch_stat()
 
-    def on_click_dispatcher(self, module_name, command):
+
+class Control(Thread):
+    """
+    This class listens on a unix socket for the commands the 'py3status'
+    command line sends to this running instance (see handle_cli_command).
+    It also writes our metrics to the 'stats_file' if we were given one.
+    """
+    def __init__(self, lock, config, py3_wrapper):
         """
-        Dispatch on_click config parameters to either:
-            - Our own methods for special py3status commands (listed below)
-            - The i3-msg program which is part of i3wm
+        Our socket is named after our pid in our control directory.
         """
-        py3_commands = ['refresh', 'refresh_all']
-        if command is None:
-            return
-        elif command in py3_commands:
-            # this is a py3status command handled by this class
-            method = getattr(self, command)
-            method(module_name)
-        else:
-            # this is a i3 message
-            self.i3_msg(module_name, command)
-
-            # to make the bar more responsive to users we ask for a refresh
-            # of the module or of i3status if the module is an i3status one
-            self.refresh(module_name)
+        Thread.__init__(self, name='control')
+        self.daemon = True
+        self.commands = {}
+        self.config = config
+        self.lock = lock
+        self.path = os.path.join(
+            self.get_control_dir(),
+            '{}.sock'.format(os.getpid())
+        )
+        self.py3_wrapper = py3_wrapper
+        self.server = None
 
     @staticmethod
-    def i3_msg(module_name, command):
+    def get_control_dirs():
         """
-        Execute the given i3 message and log its output.
+        Return the directories we create down to the one holding the control
+        sockets of our instances, they must be private to the user.
         """
-        i3_msg_pipe = Popen(['i3-msg', command], stdout=PIPE)
-        syslog(
-            LOG_INFO,
-            'i3-msg module="{}" command="{}" stdout={}'.format(
-                module_name,
-                command,
-                i3_msg_pipe.stdout.read()
+        runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+        dirs = []
+        if not runtime_dir:
+            # anyone can create this one before us
+            runtime_dir = os.path.join(
+                gettempdir(),
+                'py3status-{}'.format(os.getuid())
             )
-        )
+            dirs.append(runtime_dir)
+        dirs.append(os.path.join(runtime_dir, 'py3status'))
+        return dirs
 
-    def i3status_mod_guess(self, instance, name):
+    @classmethod
+    def get_control_dir(cls):
         """
-        Some i3status modules output a name and instance that are different
-        from the configuration parameters in i3status.conf.
+        Return the directory holding the control sockets of our instances.
+        """
+        return cls.get_control_dirs()[-1]
+
+    @classmethod
+    def check_control_dir(cls, create=False):
+        """
+        Make sure that our control directories are real directories owned by
+        the user and only accessible to them, creating them if asked to.
+        Raise an OSError otherwise.
+        """
+        for path in cls.get_control_dirs():
+            if create:
+                try:
+                    os.mkdir(path, 0o700)
+                except OSError:
+                    err = sys.exc_info()[1]
+                    if err.errno != errno.EEXIST:
+                        raise
+            # do not follow a symlink to someone else's directory
+            stat = os.lstat(path)
+            if (
+                not S_ISDIR(stat.st_mode) or
+                stat.st_uid != os.getuid() or
+                S_IMODE(stat.st_mode) != 0o700
+            ):
+                raise OSError(
+                    errno.EPERM,
+                    'not a private directory owned by uid {}'.format(
+                        os.getuid()
+                    ),
+                    path
+                )
+
+    @classmethod
+    def send_command(cls, command):
+        """
+        Send the given command to every running py3status instance and
+        return a list of (pid, response) tuples.
+        """
+        responses = []
+        control_dir = cls.get_control_dir()
+        try:
+            cls.check_control_dir()
+        except OSError:
+            err = sys.exc_info()[1]
+            if err.errno != errno.ENOENT:
+                print_stderr(
+                    'Warning: ignoring control directory ({})'.format(err)
+                )
+            return responses
+        for f_name in sorted(os.listdir(control_dir)):
+            if not f_name.endswith('.sock'):
+                continue
+            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                client.settimeout(5)
+                client.connect(os.path.join(control_dir, f_name))
+                client.sendall('{}\n'.format(' '.join(command)).encode())
+                response = b''
+                while True:
+                    data = client.recv(4096)
+                    if not data:
+                        break
+                    response += data
+            except (IOError, OSError):
+                # a stale socket left by a killed instance
+                continue
+            finally:
+                client.close()
+            responses.append((f_name[:-5], response.decode('utf-8')))
+        return responses
+
+    def register(self, command, handler):
+        """
+        Call the given handler with the arguments of the given command
+        when we receive it, its return value is sent back as response.
+        """
+        self.commands[command] = handler
+
+    def handle(self, conn):
+        """
+        Read a command from the given connection and send back the response.
+        """
+        conn.settimeout(1)
+        request = b''
+        while not request.endswith(b'\n') and len(request) < 4096:
+            data = conn.recv(4096)
+            if not data:
+                break
+            request += data
+        command = request.decode('utf-8').split()
+        if not command or command[0] not in self.commands:
+            response = 'Error: unknown command\n'
+        else:
+            try:
+                response = self.commands[command[0]](command[1:])
+            except Exception:
+                err = sys.exc_info()[1]
+                response = 'Error: {}\n'.format(err)
+        conn.sendall(response.encode('utf-8'))
+
+    def write_stats_file(self):
+        """
+        Write our metrics in the OpenMetrics text format to the stats file,
+        for a node exporter textfile collector to scrape.
+        """
+        stats_file = self.config['stats_file']
+        try:
+            with NamedTemporaryFile(
+                'w', dir=os.path.dirname(os.path.abspath(stats_file)),
+                delete=False
+            ) as f:
+                f.write(self.py3_wrapper.get_openmetrics())
+            os.chmod(f.name, 0o644)
+            os.rename(f.name, stats_file)
+        except Exception:
+            err = sys.exc_info()[1]
+            syslog(LOG_WARNING, 'unable to write stats ({})'.format(err))
+
+    def stop(self):
+        """
+        Remove our socket.
+        """
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def run(self):
+        """
+        Serve the commands we receive one after the other.
+        """
+        try:
+            self.check_control_dir(create=True)
+            self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.server.bind(self.path)
+            os.chmod(self.path, 0o600)
+            self.server.listen(5)
+        except Exception:
+            err = sys.exc_info()[1]
+            syslog(LOG_WARNING, 'control socket disabled ({})'.format(err))
+            return
+
+        timeout = None
+        if self.config['stats_file']:
+            timeout = self.config['stats_interval']
+            next_write = time()
+        while self.lock.is_set():
+            if timeout is not None:
+                if time() >= next_write:
+                    self.write_stats_file()
+                    next_write = time() + timeout
+                timeout = max(next_write - time(), 0)
+            readable, _, _ = select.select([self.server], [], [], timeout)
+            if not readable:
+                continue
+            conn, _ = self.server.accept()
+            try:
+                self.handle(conn)
+            except Exception:
+                err = sys.exc_info()[1]
+                syslog(LOG_WARNING, 'control command failed ({})'.format(err))
+            finally:
+                conn.close()
+
+
+class Logger(Thread):
+    """
+    This class writes the messages of the busy code paths (module failures,
+    debug output) to syslog from a background thread.
+
+    Messages are queued without blocking and formatted by the thread. A
+    message is logged once per 'log_window' seconds for a given key (its
+    text by default), its repeats being counted and reported at the end of
+    the window. At most 'log_rate' lines are written per second, the others
+    are dropped and counted, as are messages that do not fit in the queue.
+    """
+    def __init__(self, config):
+        """
+        The queue is bounded so that logging never grows our memory.
+        """
+        Thread.__init__(self, name='logger')
+        self.daemon = True
+        self.config = config
+        self.counters = {'dropped': 0, 'repeated': 0, 'written': 0}
+        self.dropped_ts = 0
+        self.queue = Queue(maxsize=256)
+        self.reported_dropped = 0
+        # key: [level, last text, repeats, end of window]
+        self.repeats = {}
+        self.tokens = config['log_rate'] * 5
+        self.tokens_ts = time()
+
+    def log(self, level, msg, key=None, **fields):
+        """
+        Queue the given message, it will be formatted with the given fields.
+        Messages sharing the same key are aggregated.
+        """
+        try:
+            self.queue.put_nowait((level, msg, key, fields))
+        except Full:
+            self.counters['dropped'] += 1
+
+    def write(self, level, text):
+        """
+        Write the given text to syslog if the rate limit allows it.
+        """
+        rate = self.config['log_rate']
+        if rate > 0:
+            # allow bursts of a few seconds worth of lines
+            now = time()
+            self.tokens = min(
+                rate * 5, self.tokens + (now - self.tokens_ts) * rate
+            )
+            self.tokens_ts = now
+            if self.tokens < 1:
+                self.counters['dropped'] += 1
+                return
+            self.tokens -= 1
+        syslog(level, text)
+        self.counters['written'] += 1
+
+    def handle(self, level, msg, key, fields):
+        """
+        Format the given message and write it unless it is a repeat.
+        """
+        try:
+            text = msg.format(**fields) if fields else msg
+        except Exception:
+            text = '{} {}'.format(msg, fields)
+        window = self.config['log_window']
+        if window <= 0:
+            self.write(level, text)
+            return
+        if key is None:
+            key = text
+        entry = self.repeats.get(key)
+        if entry is not None:
+            entry[1] = text
+            entry[2] += 1
+            self.counters['repeated'] += 1
+            return
+        self.repeats[key] = [level, text, 0, time() + window]
+        self.write(level, text)
+
+    def flush(self, now):
+        """
+        Report the repeats of the windows ending before the given time and
+        the messages dropped since our last report. Return the time until
+        our next report or None.
+        """
+        timeout = None
+        for key, (level, text, repeats, until) in list(self.repeats.items()):
+            if until > now:
+                if timeout is None or until - now < timeout:
+                    timeout = until - now
+                continue
+            del self.repeats[key]
+            if repeats:
+                self.write(
+                    level,
+                    '{} (repeated {} times in {}s)'.format(
+                        text, repeats, self.config['log_window']
+                    )
+                )
+        dropped = self.counters['dropped'] - self.reported_dropped
+        if dropped:
+            next_report = self.dropped_ts + max(self.config['log_window'], 1)
+            if now >= next_report:
+                # this one bypasses the rate limit
+                self.dropped_ts = now
+                self.reported_dropped = self.counters['dropped']
+                syslog(
+                    LOG_WARNING, 'dropped {} log messages'.format(dropped)
+                )
+                self.counters['written'] += 1
+            elif timeout is None or next_report - now < timeout:
+                timeout = next_report - now
+        return timeout
+
+    def stop(self):
+        """
+        Report what we still hold and exit.
+        """
+        if self.is_alive():
+            self.queue.put(None)
+            self.join(1)
+
+    def run(self):
+        """
+        Write the queued messages until we are stopped.
+        """
+        timeout = None
+        while True:
+            try:
+                item = self.queue.get(timeout=timeout)
+            except Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                self.handle(*item)
+            timeout = self.flush(time())
+        self.flush(float('inf'))
+
+
+class Writer(Thread):
+    """
+    This class writes our output to i3bar so that the main loop never
+    blocks when i3bar stops reading it.
+
+    Only the latest bar line is kept: a line given to write_line replaces
+    the one still waiting to be written which is then dropped. We write no
+    more than the pipe can take without blocking once select tells us it
+    is writable, the time we spend waiting for it is accounted as blocked.
+    """
+    def __init__(self, lock, py3_wrapper):
+        """
+        We write to the real stdout, the modules' one goes to /dev/null.
+        """
+        Thread.__init__(self, name='writer')
+        self.daemon = True
+        self.condition = Condition()
+        self.counters = {'blocked': 0.0, 'dropped': 0, 'written': 0}
+        self.data = b''
+        self.error = None
+        self.fd = sys.__stdout__.fileno()
+        self.header = []
+        self.line = None
+        self.lock = lock
+        self.prefix = ''
+        self.py3_wrapper = py3_wrapper
+
+    def write_header(self, line):
+        """
+        Queue the given protocol header line, it is never dropped.
+        """
+        with self.condition:
+            self.header.append(line)
+            self.condition.notify()
+
+    def write_line(self, line):
+        """
+        Queue the given bar line in place of the one not written yet. The
+        lines are separated as the i3bar protocol infinite array wants.
+        """
+        with self.condition:
+            if self.line is not None:
+                self.counters['dropped'] += 1
+            self.line = line
+            self.condition.notify()
+
+    def stop(self):
+        """
+        Wake up our thread so that it notices the cleared lock.
+        """
+        with self.condition:
+            self.condition.notify()
+
+    def run(self):
+        """
+        Write the queued lines whenever stdout is writable.
+        """
+        chunk_size = getattr(select, 'PIPE_BUF', 512)
+        try:
+            while self.lock.is_set():
+                with self.condition:
+                    # take the next line once the current one is written
+                    while not (self.data or self.header or self.line):
+                        if not self.lock.is_set():
+                            return
+                        self.condition.wait()
+                    if not self.data:
+                        if self.header:
+                            line = self.header.pop(0)
+                        else:
+                            line = self.prefix + self.line
+                            self.line = None
+                            self.prefix = ','
+                            self.counters['written'] += 1
+                        self.data = '{}\n'.format(line).encode('utf-8')
+
+                start = time()
+                _, writable, _ = select.select([], [self.fd], [], 1)
+                self.counters['blocked'] += time() - start
+                if writable:
+                    # up to PIPE_BUF bytes can be written without blocking
+                    written = os.write(self.fd, self.data[:chunk_size])
+                    self.data = self.data[written:]
+        except (IOError, OSError):
+            # i3bar is gone
+            self.error = sys.exc_info()[1]
+        finally:
+            self.py3_wrapper.notify_update()
+
+
+class Events(Thread):
+    """
+    This class is responsible for dispatching event JSONs sent by the i3bar.
+    """
+    def __init__(self, lock, config, modules, i3s_config, py3_wrapper):
+        """
+        We need to poll stdin to receive i3bar messages.
+        """
+        Thread.__init__(self, name='events')
+        # we block on stdin, do not prevent py3status from exiting
+        self.daemon = True
+        self.click_events_module = None
+        self.click_index = {}
+        self.click_names = {}
+        # modules whose on_click is running, only added to by our thread
+        self.clicking = set()
+        self.config = config
+        self.i3s_config = i3s_config
+        self.index_lock = Lock()
+        self.lock = lock
+        self.modules = modules
+        self.on_click = i3s_config['on_click']
+        self.poller_inp = IOPoller(sys.stdin)
+        self.py3_wrapper = py3_wrapper
+
+    def dispatch(self, module, obj, event):
+        """
+        Dispatch the event or enforce the default clear cache action.
+        """
+        module_name = '{} {}'.format(
+            module.module_name,
+            module.module_inst
+        ).strip()
+        #
+        if module.click_events:
+            # a hung on_click would have every click abandon another worker
+            if module.module_full_name in self.clicking:
+                self.py3_wrapper.logger.log(
+                    LOG_WARNING,
+                    'module {module} on_click still running, ignoring event '
+                    '({event})',
+                    key=(module.module_full_name, 'on_click', 'running'),
+                    event=event,
+                    module=module.module_full_name
+                )
+                return
+
+            # module accepts click_events, use it from a scheduler worker so
+            # that a hung on_click does not block the events
+            def click():
+                try:
+                    module.click_event(event)
+                finally:
+                    self.clicking.discard(module.module_full_name)
+                self.refresh(module_name)
+                self.py3_wrapper.notify_update()
+
+            self.clicking.add(module.module_full_name)
+            self.py3_wrapper.scheduler.submit(click)
+            if self.config['debug']:
+                self.py3_wrapper.logger.log(
+                    LOG_INFO, 'dispatching event {event}', event=event
+                )
+            return
+
+        # default button 2 action is to clear this method's cache
+        if self.config['debug']:
+            self.py3_wrapper.logger.log(
+                LOG_INFO, 'dispatching default event {event}', event=event
+            )
+
+        # to make the bar more responsive to users we ask for a refresh
+        # of the module or of i3status if the module is an i3status one
+        self.refresh(module_name)
+        self.py3_wrapper.notify_update()
+
+    def register_module(self, module):
+        """
+        Index the given module when it is loaded.
+
+        When py3status detects a module named 'i3bar_click_events.py',
+        it will dispatch i3status click events to this module so you can catch
+        them and trigger any function call based on the event.
+        """
+        if module.click_events and (
+            module.module_name == 'i3bar_click_events.py'
+        ):
+            self.click_events_module = module
+        for obj in module.methods.values():
+            if obj['name'] is not None:
+                self.register_method(module, obj)
+
+    def register_method(self, module, obj):
+        """
+        Index the given method of the given module on its name and instance
+        once it reported them, so that events are dispatched in O(1).
+
+        Only the first method (alphabetically) of a module matching a name
+        and instance gets the event. The indexes are replaced and never
+        modified so that dispatching does not need to hold the lock.
+        """
+        with self.index_lock:
+            for index, key in (
+                (self.click_index, (obj['name'], obj['instance'])),
+                (self.click_names, obj['name'])
+            ):
+                entries = index.get(key, [])
+                for m, o in entries:
+                    if m is module and o['method'] < obj['method']:
+                        break
+                else:
+                    index[key] = [
+                        (m, o) for m, o in entries if m is not module
+                    ] + [(module, obj)]
+
+    def unregister_module(self, module):
+        """
+        Remove the given module from the indexes.
+        """
+        with self.index_lock:
+            for index in (self.click_index, self.click_names):
+                for key, entries in list(index.items()):
+                    entries = [(m, o) for m, o in entries if m is not module]
+                    if entries:
+                        index[key] = entries
+                    else:
+                        del index[key]
+            if self.click_events_module is module:
+                self.click_events_module = None
+
+    def i3bar_click_events_module(self):
+        """
+        Return the special i3bar_click_events.py module if it is loaded.
+        """
+        return self.click_events_module or False
+
+    def refresh(self, module_name):
+        """
+        Force a cache expiration for all the methods of the given module or
+        a refresh of i3status if it is one of its modules.
+        """
+        if self.config['debug']:
+            syslog(LOG_INFO, 'refresh module {}'.format(module_name))
+        self.py3_wrapper.refresh_modules([module_name])
+
+    def refresh_all(self, module_name):
+        """
+        Force a full refresh of py3status and i3status modules.
+        """
+        self.py3_wrapper.refresh_modules()
+
+    def on_click_dispatcher(self, module_name, command):
+        """
+        Dispatch on_click config parameters to either:
+            - Our own methods for special py3status commands (listed below)
+            - The i3-msg program which is part of i3wm
+        """
+        py3_commands = ['refresh', 'refresh_all']
+        if command is None:
+            return
+        elif command in py3_commands:
+            # this is a py3status command handled by this class
+            method = getattr(self, command)
+            method(module_name)
+        else:
+            # this is a i3 message
+            self.i3_msg(module_name, command)
+
+            # to make the bar more responsive to users we ask for a refresh
+            # of the module or of i3status if the module is an i3status one
+            self.refresh(module_name)
+
+    @staticmethod
+    def i3_msg(module_name, command):
+        """
+        Execute the given i3 message and log its output.
+        """
+        i3_msg_pipe = Popen(['i3-msg', command], stdout=PIPE)
+        syslog(
+            LOG_INFO,
+            'i3-msg module="{}" command="{}" stdout={}'.format(
+                module_name,
+                command,
+                i3_msg_pipe.stdout.read()
+            )
+        )
+
+    def i3status_mod_guess(self, instance, name):
+        """
+        Some i3status modules output a name and instance that are different
+        from the configuration parameters in i3status.conf.
 
         For example the 'disk' module will output with name 'disk_info' so
         we try to be clever and figure it out here, case by case.
@@ -796,7 +1728,6 @@ class Events(Thread):
         finally:
             return (instance, name)
 
-    @profile
     def run(self):
         """
         Wait for an i3bar JSON event, then find the right module to dispatch
@@ -810,14 +1741,22 @@ class Events(Thread):
         {'y': 13, 'x': 1737, 'button': 1, 'name': 'empty', 'instance': 'first'}
         """
         while self.lock.is_set():
-            event = self.poller_inp.readline()
+            # block until i3bar sends us something
+            event = self.poller_inp.readline(timeout=None)
             if not event:
-                sleep(0.20)
+                if self.poller_inp.closed:
+                    # i3bar will not send us anything anymore, this is not
+                    # worth an i3-nagbar warning
+                    syslog(LOG_INFO, 'stdin closed, click events disabled')
+                    self.i3_nagbar = True
+                    break
                 continue
             try:
                 with jsonify(event) as (prefix, event):
                     if self.config['debug']:
-                        syslog(LOG_INFO, 'received event {}'.format(event))
+                        self.py3_wrapper.logger.log(
+                            LOG_INFO, 'received event {event}', event=event
+                        )
 
                     # usage variables
                     button = event.get('button', 0)
@@ -829,11 +1768,10 @@ class Events(Thread):
                     # i3status module name guess
                     instance, name = self.i3status_mod_guess(instance, name)
                     if self.config['debug']:
-                        syslog(
+                        self.py3_wrapper.logger.log(
                             LOG_INFO,
-                            'trying to dispatch event to module "{}"'.format(
-                                '{} {}'.format(name, instance).strip()
-                            )
+                            'trying to dispatch event to module "{module}"',
+                            module='{} {}'.format(name, instance).strip()
                         )
 
                     # guess the module config name
@@ -850,64 +1788,148 @@ class Events(Thread):
                     elif button == 2:
                         default_event = True
 
-                    for module in self.modules.values():
+                    # find the modules having a method of this name and
+                    # instance, or only of this name if there is no instance
+                    if instance:
+                        candidates = self.click_index.get(
+                            (name, instance), []
+                        )
+                    else:
+                        candidates = self.click_names.get(name, [])
+
+                    obj = None
+                    for module, obj in candidates:
                         # skip modules not supporting click_events
                         # unless we have a default_event set
                         if not module.click_events and not default_event:
                             continue
-
-                        # check for the method name/instance
-                        for obj in module.methods.values():
-                            if name == obj['name']:
-                                if instance:
-                                    if instance == obj['instance']:
-                                        self.dispatch(module, obj, event)
-                                        dispatched = True
-                                        break
-                                else:
-                                    self.dispatch(module, obj, event)
-                                    dispatched = True
-                                    break
+                        self.dispatch(module, obj, event)
+                        dispatched = True
 
                     # fall back to i3bar_click_events.py module if present
                     if not dispatched:
                         module = self.i3bar_click_events_module()
                         if module:
                             if self.config['debug']:
-                                syslog(
+                                self.py3_wrapper.logger.log(
                                     LOG_INFO,
                                     'dispatching event to i3bar_click_events'
                                 )
                             self.dispatch(module, obj, event)
             except Exception:
                 err = sys.exc_info()[1]
-                syslog(LOG_WARNING, 'event failed ({})'.format(err))
+                self.py3_wrapper.logger.log(
+                    LOG_WARNING, 'event failed ({error})', error=err
+                )
 
 
-class Module(Thread):
+class MethodStats:
     """
-    This class represents a user module (imported file).
-    It is reponsible for executing it every given interval and
-    caching its output based on user will.
+    This class accumulates the execution metrics of a module method.
+    Durations are in seconds, the CPU time is the one of the thread calling
+    the method and is not measured for coroutine methods.
     """
-    def __init__(self, lock, config, module, i3_thread, user_modules):
+    # upper bounds of the duration histogram buckets
+    buckets = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10)
+
+    def __init__(self):
         """
-        We need quite some stuff to occupy ourselves don't we ?
+        All counters start at zero.
         """
-        Thread.__init__(self)
-        self.click_events = False
-        self.config = config
-        self.has_kill = False
-        self.i3status_thread = i3_thread
-        self.last_output = []
-        self.lock = lock
-        self.methods = OrderedDict()
+        self.cache_hits = 0
+        self.calls = 0
+        self.cpu_time = 0.0
+        self.errors = 0
+        self.histogram = [0] * (len(self.buckets) + 1)
+        self.last_duration = None
+        self.overdue = 0
+        self.wall_time = 0.0
+
+    def record(self, duration, cpu_time=None, error=False):
+        """
+        Account for a call which took the given wall and CPU time.
+        """
+        self.calls += 1
+        if error:
+            self.errors += 1
+        self.last_duration = duration
+        self.wall_time += duration
+        if cpu_time is not None:
+            self.cpu_time += cpu_time
+        for index, bound in enumerate(self.buckets):
+            if duration <= bound:
+                break
+        else:
+            index = len(self.buckets)
+        self.histogram[index] += 1
+
+    def cache_hit(self):
+        """
+        Account for a run which found the method output still cached.
+        """
+        self.cache_hits += 1
+
+    def get_cache_ratio(self):
+        """
+        Return the ratio of runs served from the cache.
+        """
+        total = self.cache_hits + self.calls
+        if not total:
+            return 0.0
+        return float(self.cache_hits) / total
+
+
+class Module:
+    """
+    This class represents a user module (imported file).
+    It is reponsible for executing its methods when the Scheduler asks
+    for it and caching their output based on user will.
+    """
+    # the (module, method, start time) being called by each thread, see
+    # calling_context
+    calling = {}
+    # methods discovered from the source of modules, see discover_methods
+    discovered = {}
+    ignored_decorators = set(
+        ['deleter', 'getter', 'property', 'setter', 'staticmethod']
+    )
+    # the (module, setting, value) we warned about, see check_setting
+    invalid_settings = set()
+
+    def __init__(self, lock, config, module, user_modules, py3_wrapper):
+        """
+        We need quite some stuff to occupy ourselves don't we ?
+        """
+        self.click_events = False
+        self.config = config
+        self.has_kill = False
+        self.last_output = []
+        self.lock = lock
+        self.executor = None
+        self.methods = OrderedDict()
         self.module_class = None
+        self.module_config = {}
+        self.module_full_name = module
         self.module_inst = ''.join(module.split(' ')[1:])
         self.module_name = module.split(' ')[0]
+        self.placeholder = placeholder(module)
+        self.py3_wrapper = py3_wrapper
+        self.stats = {}
+        # lazy loading of the user class and startup profile
+        self.import_lock = Lock()
+        self.import_mode = 'lazy'
+        self.import_time = None
+        self.loader = None
         #
         self.load_methods(module, user_modules)
 
+    @property
+    def i3status_thread(self):
+        """
+        The current i3status thread, it changes when i3status is respawned.
+        """
+        return self.py3_wrapper.i3status_thread
+
     @staticmethod
     def load_from_file(filepath):
         """
@@ -936,14 +1958,221 @@ class Module(Thread):
         class_inst = py_mod.Py3status()
         return class_inst
 
+    @classmethod
+    def load_class(cls, loader):
+        """
+        Return user-written class object from the given loader which is
+        either ('file', filepath) or ('namespace', module_name).
+        """
+        kind, target = loader
+        if kind == 'file':
+            return cls.load_from_file(target)
+        return cls.load_from_namespace(target)
+
+    @classmethod
+    def loader_path(cls, loader):
+        """
+        Return the source file path of the given loader or None.
+        """
+        kind, target = loader
+        if kind == 'file':
+            return target
+        return os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            'modules',
+            '{}.py'.format(target)
+        )
+
+    @classmethod
+    def discover_methods(cls, loader):
+        """
+        Return the sorted (method, is_coroutine) tuples of the Py3status
+        class found in the source of the given loader without importing it.
+        Return None when the methods can not be told reliably this way
+        (inherited or decorated methods, class built at runtime...) so that
+        the caller falls back to importing the module.
+        """
+        path = cls.loader_path(loader)
+        if not path.lower().endswith('.py'):
+            return None
+        try:
+            stat = os.stat(path)
+            key = (path, stat.st_size, stat.st_mtime)
+            if key in cls.discovered:
+                return cls.discovered[key]
+            with open(path) as f:
+                tree = ast.parse(f.read(), path)
+        except Exception:
+            return None
+
+        async_def = getattr(ast, 'AsyncFunctionDef', ())
+        methods = None
+        for node in tree.body:
+            if not isinstance(node, ast.ClassDef) or node.name != 'Py3status':
+                continue
+            bases = [getattr(base, 'id', None) for base in node.bases]
+            if methods is not None or bases not in ([], ['object']):
+                # redefined or inheriting class
+                return None
+            methods = []
+            for item in node.body:
+                if not isinstance(item, (ast.FunctionDef, async_def)):
+                    continue
+                if item.name.startswith('_'):
+                    continue
+                decorators = [
+                    getattr(decorator, 'id', getattr(decorator, 'attr', None))
+                    for decorator in item.decorator_list
+                ]
+                if set(decorators) & cls.ignored_decorators:
+                    continue
+                if decorators not in ([], ['classmethod']):
+                    return None
+                methods.append((
+                    item.name,
+                    isinstance(item, async_def) and not decorators
+                ))
+        if methods is None:
+            return None
+        methods = sorted(set(methods))
+        if len(set(name for name, _ in methods)) != len(methods):
+            return None
+        cls.discovered[key] = methods
+        return methods
+
+    @staticmethod
+    def get_methods(class_inst):
+        """
+        Return the sorted names of the public methods of the given user
+        class, this includes the reserved 'on_click' and 'kill' methods.
+        Decorated methods such as @property or @staticmethod are ignored.
+        """
+        methods = []
+        for method in sorted(dir(class_inst)):
+            if method.startswith('_'):
+                continue
+            m_type = type(getattr(class_inst, method))
+            if 'method' in str(m_type):
+                methods.append(method)
+        return methods
+
+    def get_instance(self):
+        """
+        Return the instance of the user class, import and instantiate it on
+        first use. This is done by the module loader workers so that modules
+        with heavy imports or constructors do not delay the others.
+        """
+        with self.import_lock:
+            if self.module_class is None:
+                start = time()
+                try:
+                    with self.calling_context('__init__'):
+                        class_inst = self.load_class(self.loader)
+                    if not class_inst:
+                        raise ImportError('no Py3status class found')
+
+                    # apply module configuration from i3status config
+                    for config, value in self.module_config.items():
+                        setattr(class_inst, config, value)
+                    self.module_class = class_inst
+                finally:
+                    self.import_time = time() - start
+        return self.module_class
+
+    def get_setting(self, name):
+        """
+        Return the given core setting for this module, it can be overridden
+        from the module's i3status config section or by the module itself.
+        The config parser only gives us integers and strings so numeric
+        settings are converted, invalid values are ignored with a warning.
+        """
+        if name in self.module_config:
+            value = self.module_config[name]
+        else:
+            value = getattr(self.module_class, name, self.config[name])
+        return self.check_setting(
+            self.py3_wrapper, self.module_full_name, name, value
+        )
+
+    @staticmethod
+    def check_setting(py3_wrapper, module_full_name, name, value):
+        """
+        Return the given value of the given core setting of the given module
+        as a number if the setting is a numeric one, its default if the value
+        is invalid. The user is warned once about each invalid value.
+        """
+        default = py3_wrapper.config[name]
+        numeric = (
+            isinstance(default, (int, float)) and
+            not isinstance(default, bool)
+        )
+        if not numeric or value is default:
+            return value
+        try:
+            number = float(value)
+            if number < 0:
+                raise ValueError('negative value')
+            # a null factor would have the module run continuously
+            if number == 0 and name in FACTOR_SETTINGS:
+                raise ValueError('null factor')
+        except (TypeError, ValueError):
+            err = sys.exc_info()[1]
+            key = (module_full_name, name, repr(value))
+            if key not in Module.invalid_settings:
+                Module.invalid_settings.add(key)
+                py3_wrapper.i3_nagbar(
+                    'invalid {} {!r} for module {} ({}), using {}'.format(
+                        name, value, module_full_name, err, default
+                    ),
+                    level='warning'
+                )
+            return default
+        return number
+
+    def call_method(self, meth, *args):
+        """
+        Call the given method of the user class with the usual arguments
+        followed by the given ones, in our worker process if we have one.
+        """
+        args = (
+            self.i3status_thread.get_json_list(),
+            self.i3status_thread.config['general']
+        ) + args
+        with self.calling_context(meth):
+            if self.executor is not None:
+                return self.executor.call(meth, args, self.get_setting(
+                    'method_timeout'
+                ))
+            return getattr(self.get_instance(), meth)(*args)
+
+    @contextmanager
+    def calling_context(self, meth):
+        """
+        Remember that the current thread is calling the given method of this
+        module so that the profiler can attribute its samples to us and the
+        scheduler can watch for the call deadline.
+        """
+        ident = get_ident()
+        previous = Module.calling.get(ident)
+        Module.calling[ident] = (self, meth, time())
+        try:
+            yield
+        finally:
+            if previous is None:
+                Module.calling.pop(ident, None)
+            else:
+                Module.calling[ident] = previous
+
     def clear_cache(self):
         """
-        Reset the cache for all methods of this module.
+        Reset the cache for all methods of this module and ask the Scheduler
+        to run it as soon as possible.
         """
         for meth in self.methods:
             self.methods[meth]['cached_until'] = time()
             if self.config['debug']:
                 syslog(LOG_INFO, 'clearing cache for method {}'.format(meth))
+        self.py3_wrapper.scheduler.schedule(self, time())
 
     def load_methods(self, module, user_modules):
         """
@@ -952,7 +2181,12 @@ class Module(Thread):
             - private methods starting with _
             - decorated methods such as @property or @staticmethod
             - 'on_click' methods as they'll be called upon a click_event
-            - 'kill' methods as they'll be called upon this thread's exit
+            - 'kill' methods as they'll be called upon py3status' exit
+        Coroutine methods (async def) will be run on a shared event loop.
+        Modules configured with 'executor = "process"' are instantiated and
+        run in their own worker process.
+        The methods are discovered from the source of the module whenever
+        possible, its import is then deferred until a method first runs.
         """
         # user provided modules take precedence over py3status provided modules
         if self.module_name in user_modules:
@@ -965,7 +2199,7 @@ class Module(Thread):
                     f_name
                 )
             )
-            class_inst = self.load_from_file(include_path + f_name)
+            loader = ('file', include_path + f_name)
         # load from py3status provided modules
         else:
             syslog(
@@ -975,42 +2209,65 @@ class Module(Thread):
                     self.module_name
                 )
             )
-            class_inst = self.load_from_namespace(self.module_name)
-
-        if class_inst:
-            self.module_class = class_inst
-
-            # apply module configuration from i3status config
-            mod_config = self.i3status_thread.config.get(module, {})
-            for config, value in mod_config.items():
-                setattr(self.module_class, config, value)
-
-            # get the available methods for execution
-            for method in sorted(dir(class_inst)):
-                if method.startswith('_'):
-                    continue
-                else:
-                    m_type = type(getattr(class_inst, method))
-                    if 'method' in str(m_type):
-                        if method == 'on_click':
-                            self.click_events = True
-                        elif method == 'kill':
-                            self.has_kill = True
-                        else:
-                            # the method_obj stores infos about each method
-                            # of this module.
-                            method_obj = {
-                                'cached_until': time(),
-                                'instance': None,
-                                'last_output': {
-                                    'name': method,
-                                    'full_text': ''
-                                },
-                                'method': method,
-                                'name': None,
-                                'position': 0
-                            }
-                            self.methods[method] = method_obj
+            loader = ('namespace', self.module_name)
+
+        # module configuration from i3status config
+        self.module_config = self.i3status_thread.config.get(module, {})
+        self.loader = loader
+
+        if self.module_config.get('executor') == 'process':
+            # the module is instantiated and run in its own worker process
+            start = time()
+            self.executor = ProcessExecutor(
+                module,
+                loader,
+                self.module_config,
+                debug=self.config['debug'],
+                max_calls=self.get_setting('executor_max_calls'),
+                max_rss=self.get_setting('executor_max_rss'),
+                method_timeout=self.get_setting('method_timeout')
+            )
+            self.import_time = time() - start
+            methods = [(method, False) for method in self.executor.methods]
+            self.import_mode = 'process'
+        else:
+            methods = self.discover_methods(loader)
+            if methods is None:
+                # we have to import the module to know its methods
+                self.import_mode = 'eager'
+                class_inst = self.get_instance()
+                methods = [
+                    (method, iscoroutinefunction(getattr(class_inst, method)))
+                    for method in self.get_methods(class_inst)
+                ]
+
+        # get the available methods for execution
+        for method, is_coroutine in methods:
+            if method == 'on_click':
+                self.click_events = True
+            elif method == 'kill':
+                self.has_kill = True
+            else:
+                # the method_obj stores infos about each method
+                # of this module.
+                method_obj = {
+                    'async': is_coroutine,
+                    'cached_until': time(),
+                    # consecutive failures, see set_failure
+                    'failures': 0,
+                    'instance': None,
+                    # displayed until the first run of the method
+                    'last_output': self.placeholder,
+                    'method': method,
+                    'name': None,
+                    'position': 0,
+                    'running': False
+                }
+                self.methods[method] = method_obj
+                self.stats[method] = MethodStats()
+
+        # warm start from the still fresh outputs of our previous run
+        self.restore_state(self.py3_wrapper.pop_state(module))
 
         # done, syslog some debug info
         if self.config['debug']:
@@ -1026,116 +2283,1429 @@ class Module(Thread):
 
     def click_event(self, event):
         """
-        Execute the 'on_click' method of this module with the given event.
+        Execute the 'on_click' method of this module with the given event.
+        """
+        try:
+            self.call_method('on_click', event)
+        except Exception:
+            err = sys.exc_info()[1]
+            self.py3_wrapper.logger.log(
+                LOG_WARNING,
+                'module {module} on_click failed with ({error}) for event '
+                '({event})',
+                key=(self.module_full_name, 'on_click', str(err)),
+                error=err,
+                event=event,
+                module=self.module_full_name
+            )
+
+    def next_run(self):
+        """
+        Return the timestamp at which this module should be run again, that
+        is when the cache of its first method expires. Methods with an
+        already expired cache (not run yet) are retried every interval.
+        Return None if all our methods are running coroutines.
+        """
+        now = time()
+        next_run = None
+        for obj in self.methods.values():
+            # running coroutines will reschedule us when they complete
+            if obj['running']:
+                continue
+            cached_until = obj['cached_until']
+            if cached_until <= now:
+                cached_until = now + self.config['interval']
+            if next_run is None or cached_until < next_run:
+                next_run = cached_until
+        return next_run
+
+    def get_config_digest(self):
+        """
+        Return a digest of our i3status config section.
+        """
+        config = dumps(self.module_config, sort_keys=True)
+        return sha1(config.encode()).hexdigest()
+
+    def get_state(self):
+        """
+        Return the state of our methods which output is still fresh so that
+        it can be restored on our next start, see restore_state.
+        """
+        now = time()
+        methods = {}
+        for meth, obj in self.methods.items():
+            if obj['last_output'] is self.placeholder:
+                continue
+            if obj['cached_until'] <= now:
+                continue
+            methods[meth] = dict(
+                (key, obj[key]) for key in (
+                    'cached_until', 'instance', 'last_output', 'name',
+                    'position'
+                )
+            )
+        if not methods:
+            return None
+        return {'config': self.get_config_digest(), 'methods': methods}
+
+    def restore_state(self, state):
+        """
+        Restore the output of our methods from the given state saved on our
+        previous run if our config did not change. Only the outputs which
+        are still fresh are restored so that their method does not run
+        before their cache expires.
+        """
+        if not state or state['config'] != self.get_config_digest():
+            return
+        now = time()
+        for meth, saved in state['methods'].items():
+            if meth not in self.methods or saved['cached_until'] <= now:
+                continue
+            self.methods[meth].update(saved)
+            if self.config['debug']:
+                syslog(
+                    LOG_INFO,
+                    'restored output of method {} until {}'.format(
+                        meth,
+                        saved['cached_until']
+                    )
+                )
+
+    def is_pending(self):
+        """
+        Return True if any of our methods did not complete its first run.
+        """
+        for obj in self.methods.values():
+            if obj['last_output'] is self.placeholder:
+                return True
+        return False
+
+    def set_stale(self, meth):
+        """
+        Mark the output of the given method as stale, its call is overdue.
+        A method which did not output anything yet keeps its placeholder.
+        The indicator goes away with the next output of the method.
+        """
+        my_method = self.methods[meth]
+        output = my_method['last_output']
+        # a copy of the placeholder would no longer be detected as one
+        if output is self.placeholder:
+            return
+        indicator = self.get_setting('stale_indicator')
+        if output['full_text'].endswith(indicator):
+            return
+        general = self.i3status_thread.config['general']
+        my_method['last_output'] = dict(
+            output,
+            color=general.get('color_degraded', '#FFFF00'),
+            full_text='{}{}'.format(output['full_text'], indicator)
+        )
+        self.py3_wrapper.notify_update()
+
+    def clear_placeholder(self, meth):
+        """
+        Stop displaying the placeholder of the given failing method.
+        """
+        my_method = self.methods[meth]
+        if my_method['last_output'] is self.placeholder:
+            my_method['last_output'] = {'name': meth, 'full_text': ''}
+            self.py3_wrapper.notify_update()
+
+    def set_response(self, meth, response):
+        """
+        Validate the response of the given method and store it as its output.
+        We will respect and set a cache timeout for the method if the user
+        didn't already do so.
+        """
+        my_method = self.methods[meth]
+
+        if isinstance(response, dict):
+            # this is a shiny new module giving a dict response
+            position, result = None, dict(response)
+            result['name'] = self.module_name
+            result['instance'] = self.module_inst
+        else:
+            # this is an old school module reporting its position
+            position, result = response
+            if not isinstance(position, int):
+                raise TypeError('position is not an int')
+            if not isinstance(result, dict):
+                raise TypeError('response should be a dict')
+            result = dict(result)
+            if 'name' not in result:
+                raise KeyError('missing "name" key in response')
+
+        # validate the response
+        if 'full_text' not in result:
+            raise KeyError('missing "full_text" key in response')
+
+        # initialize method object and index it for click events
+        if my_method['name'] is None:
+            my_method['name'] = result['name']
+            if 'instance' in result:
+                my_method['instance'] = result['instance']
+            else:
+                my_method['instance'] = result['name']
+            self.py3_wrapper.events_thread.register_method(self, my_method)
+
+        # update method object cache, refreshes longer than the interval
+        # are delayed by a random part of their period so that modules
+        # sharing the same cache timeout do not run in lockstep
+        now = time()
+        if 'cached_until' in result:
+            cached_until = result['cached_until']
+        else:
+            cached_until = now + self.config['cache_timeout']
+        period = cached_until - now
+        if period > self.config['interval']:
+            cached_until += uniform(0, period * self.get_jitter())
+        my_method['cached_until'] = cached_until
+        my_method['failures'] = 0
+
+        # update method object output and wake up the main loop only if
+        # something actually changed, our copy of the result is never
+        # modified so it is safe to share it with the main loop
+        if result != my_method['last_output']:
+            my_method['last_output'] = result
+            self.py3_wrapper.notify_update()
+
+        # update method object position
+        my_method['position'] = position
+
+        # debug info, our copy of the result is never modified so it can be
+        # formatted by the logger
+        if self.config['debug']:
+            self.py3_wrapper.logger.log(
+                LOG_INFO,
+                'method {method} returned {result}',
+                method=meth,
+                result=result
+            )
+
+    def get_jitter(self):
+        """
+        Return our 'refresh_jitter' as a fraction of the refresh period.
+        """
+        return min(self.get_setting('refresh_jitter'), 1)
+
+    def set_failure(self, meth, err):
+        """
+        Account for a failure of the given method and back off its next run
+        exponentially with the number of consecutive failures, from the
+        interval up to 'retry_max' seconds.
+        """
+        my_method = self.methods[meth]
+        my_method['failures'] += 1
+        delay = min(
+            self.config['interval'] * 2 ** min(my_method['failures'] - 1, 30),
+            self.get_setting('retry_max')
+        )
+        # jitter the retries too so failing modules do not retry together
+        delay *= uniform(1 - self.get_jitter(), 1)
+        my_method['cached_until'] = time() + delay
+        self.clear_placeholder(meth)
+        self.py3_wrapper.logger.log(
+            LOG_WARNING,
+            'user method {method} of module {module} failed ({error}), '
+            '{failures} in a row, retrying in {delay:.1f}s',
+            key=(self.module_full_name, meth, str(err)),
+            delay=delay,
+            error=err,
+            failures=my_method['failures'],
+            method=meth,
+            module=self.module_full_name
+        )
+
+    def record_stats(self, meth, start, start_cpu=None, error=False):
+        """
+        Account for a call of the given method which started at the given
+        wall and thread CPU times.
+        """
+        cpu_time = None
+        if start_cpu is not None:
+            cpu_time = thread_time() - start_cpu
+        self.stats[meth].record(time() - start, cpu_time, error)
+
+    def run_async(self, meth, start):
+        """
+        Submit the given coroutine method to the shared event loop, its
+        response will be handled when it completes so that we do not block
+        the worker thread for the duration of its I/O.
+        """
+        import asyncio
+        my_method = self.methods[meth]
+        my_method['running'] = True
+        timeout = self.get_setting('method_timeout')
+
+        def callback(future):
+            try:
+                self.set_response(meth, future.result())
+                self.record_stats(meth, start)
+            except asyncio.TimeoutError:
+                self.record_stats(meth, start, error=True)
+                self.set_failure(
+                    meth, 'timed out after {}s'.format(timeout)
+                )
+            except Exception:
+                self.record_stats(meth, start, error=True)
+                self.set_failure(meth, sys.exc_info()[1])
+            finally:
+                my_method['running'] = False
+                self.py3_wrapper.scheduler.schedule(self, self.next_run())
+
+        coroutine = self.call_method(meth)
+        self.py3_wrapper.get_async_loop().submit(coroutine, timeout, callback)
+
+    def run(self):
+        """
+        Execute every method found for this module whose cache expired.
+        Coroutine methods are submitted to the shared event loop.
+        Return the timestamp at which we should be run again.
+        """
+        # execute each method of this module
+        for meth, obj in self.methods.items():
+            # always check the lock
+            if not self.lock.is_set():
+                break
+
+            # respect the cache set for this method and do not run a
+            # coroutine method again while it is still awaited
+            if obj['running']:
+                continue
+            if time() < obj['cached_until']:
+                self.stats[meth].cache_hit()
+                continue
+
+            start = time()
+            start_cpu = thread_time() if thread_time else None
+            try:
+                if obj['async']:
+                    self.run_async(meth, start)
+                    continue
+
+                # execute method and get its output
+                response = self.call_method(meth)
+                self.set_response(meth, response)
+                self.record_stats(meth, start, start_cpu)
+            except Exception:
+                obj['running'] = False
+                self.record_stats(meth, start, start_cpu, error=True)
+                self.set_failure(meth, sys.exc_info()[1])
+
+        return self.next_run()
+
+    def kill(self):
+        """
+        Execute the 'kill' method of the module if present and if the module
+        was ever imported.
+        """
+        imported = self.module_class is not None or self.executor is not None
+        if self.has_kill and imported:
+            try:
+                self.call_method('kill')
+            except Exception:
+                # this would be stupid to die on exit
+                pass
+        if self.executor is not None:
+            self.executor.stop()
+
+
+class AsyncLoop(Thread):
+    """
+    This class runs the asyncio event loop shared by every module
+    implementing its methods as coroutines (async def), so that their
+    network I/O can overlap on a single thread.
+    """
+    def __init__(self):
+        """
+        The loop runs forever in this daemon thread.
+        """
+        import asyncio
+        Thread.__init__(self, name='async-loop')
+        self.daemon = True
+        self.loop = asyncio.new_event_loop()
+
+    def submit(self, coroutine, timeout, callback):
+        """
+        Schedule the given coroutine on the loop, cancel it after 'timeout'
+        seconds and call 'callback' with its future when it is done.
+        """
+        import asyncio
+        future = asyncio.run_coroutine_threadsafe(
+            asyncio.wait_for(coroutine, timeout),
+            self.loop
+        )
+        future.add_done_callback(callback)
+
+    def run(self):
+        """
+        Run the event loop.
+        """
+        import asyncio
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+
+def process_worker(conn, loader, module_config, debug):
+    """
+    Entry point of a module worker process: load the user class and execute
+    the method calls received from the py3status process through 'conn'.
+    """
+    # suppress modules' ouput wrt issue #20
+    if not debug:
+        sys.stdout = open('/dev/null', 'w')
+        sys.stderr = open('/dev/null', 'w')
+
+    class_inst = Module.load_class(loader)
+    if not class_inst:
+        conn.send(('error', 'no Py3status class found', 0))
+        return
+    for config, value in module_config.items():
+        setattr(class_inst, config, value)
+    conn.send(('ok', Module.get_methods(class_inst), 0))
+
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    # the event loop of our coroutine methods, created on their first call
+    loop = None
+    while True:
+        try:
+            meth, args = conn.recv()
+        except (EOFError, IOError):
+            # py3status is gone
+            break
+        try:
+            result = getattr(class_inst, meth)(*args)
+            if iscoroutine(result):
+                import asyncio
+                if loop is None:
+                    loop = asyncio.new_event_loop()
+                    asyncio.set_event_loop(loop)
+                result = loop.run_until_complete(result)
+            status = 'ok'
+        except Exception:
+            result = str(sys.exc_info()[1])
+            status = 'error'
+        # report our resident memory so a leaking worker can be recycled
+        with open('/proc/self/statm') as statm:
+            rss = int(statm.read().split()[1]) * page_size
+        conn.send((status, result, rss))
+
+
+class ProcessExecutor:
+    """
+    This class runs the methods of a module in a dedicated worker process so
+    that CPU heavy modules do not contend for the GIL with py3status.
+    The worker is recycled when it crashes, hangs, leaks memory past
+    'executor_max_rss' MB or has served 'executor_max_calls' calls.
+    """
+    def __init__(self, module, loader, module_config, debug, max_calls,
+                 max_rss, method_timeout):
+        """
+        Spawn the worker process and get the methods of the module from it.
+        The numeric settings are the ones validated by Module.get_setting.
+        """
+        self.calls = 0
+        self.conn = None
+        self.debug = debug
+        self.loader = loader
+        self.lock = Lock()
+        self.max_calls = max_calls
+        self.max_rss = max_rss * 1024 * 1024
+        self.method_timeout = method_timeout
+        self.module = module
+        self.module_config = module_config
+        self.process = None
+        #
+        with self.lock:
+            self.methods = self.spawn()
+
+    def spawn(self):
+        """
+        Start a new worker process and return the methods it found.
+        """
+        import multiprocessing
+        try:
+            # do not fork our threads, start from a fresh interpreter
+            context = multiprocessing.get_context('spawn')
+        except AttributeError:
+            context = multiprocessing
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=process_worker,
+            args=(child_conn, self.loader, self.module_config, self.debug)
+        )
+        self.process.daemon = True
+        self.process.start()
+        child_conn.close()
+        self.calls = 0
+        status, methods, _ = self.receive(self.method_timeout)
+        if status != 'ok':
+            raise RuntimeError(methods)
+        syslog(
+            LOG_INFO,
+            'module "{}" worker process {} started'.format(
+                self.module,
+                self.process.pid
+            )
+        )
+        return methods
+
+    def receive(self, timeout):
+        """
+        Return the next message from the worker, kill it if it does not
+        answer within 'timeout' seconds or died.
+        """
+        try:
+            if self.conn.poll(timeout):
+                return self.conn.recv()
+            err = 'timed out after {}s'.format(timeout)
+        except (EOFError, IOError):
+            err = 'died'
+        self.stop()
+        raise RuntimeError('worker process {}'.format(err))
+
+    def call(self, meth, args, timeout):
+        """
+        Execute the given method in the worker process and return its result.
+        """
+        with self.lock:
+            if self.process is None:
+                syslog(
+                    LOG_WARNING,
+                    'module "{}" worker process recycled'.format(self.module)
+                )
+                self.spawn()
+            try:
+                self.conn.send((meth, args))
+            except (EOFError, IOError):
+                self.stop()
+                raise RuntimeError('worker process died')
+            status, result, rss = self.receive(timeout)
+            self.calls += 1
+            if (
+                (self.max_calls and self.calls >= self.max_calls) or
+                (self.max_rss and rss > self.max_rss)
+            ):
+                # we will spawn a fresh worker on next call
+                self.stop()
+        if status != 'ok':
+            raise RuntimeError(result)
+        return result
+
+    def stop(self):
+        """
+        Terminate the worker process.
+        """
+        if self.process is not None:
+            self.conn.close()
+            self.process.terminate()
+            self.process.join(1)
+            self.process = None
+
+
+class ModuleLoader(Thread):
+    """
+    This class loads the modules in a bounded pool of worker threads so
+    that a slow module does not delay the others. Modules imported lazily
+    are only instantiated on their first run, the others (eager imports
+    and process executors) are imported and instantiated here. A module
+    still loading after 'init_timeout' seconds is given up on and its
+    worker thread is replaced.
+    """
+    def __init__(self, lock, config, py3_wrapper):
+        """
+        The workers are started along with the loader thread.
+        """
+        Thread.__init__(self, name='module-loader')
+        self.daemon = True
+        self.condition = Condition()
+        self.config = config
+        self.jobs = deque()
+        self.loaded = deque()
+        self.loading = {}
+        self.lock = lock
+        self.py3_wrapper = py3_wrapper
+
+    def load(self, module, user_modules, module_config):
+        """
+        Queue the given module for loading unless it is already loading.
+        """
+        with self.condition:
+            if module in self.loading:
+                return
+            job = {
+                'abandoned': False,
+                'config': module_config,
+                'module': module,
+                'started': None,
+                'timeout': Module.check_setting(
+                    self.py3_wrapper,
+                    module,
+                    'init_timeout',
+                    module_config.get(
+                        'init_timeout',
+                        self.config['init_timeout']
+                    )
+                ),
+                'user_modules': user_modules
+            }
+            self.loading[module] = job
+            self.jobs.append(job)
+            self.condition.notify_all()
+
+    def cancel(self, module):
+        """
+        Forget about the given module if it is loading, it will be killed
+        as soon as its initialization completes.
+        """
+        with self.condition:
+            job = self.loading.pop(module, None)
+            if job is None:
+                return
+            job['abandoned'] = True
+            if job in self.jobs:
+                self.jobs.remove(job)
+
+    def get_loading(self):
+        """
+        Return a dict of the loading modules and their config.
+        """
+        with self.condition:
+            return dict(
+                (module, job['config']) for module, job in self.loading.items()
+            )
+
+    def is_idle(self):
+        """
+        Return True if no module is loading or waiting to be registered.
+        """
+        with self.condition:
+            return not self.loading and not self.loaded
+
+    def get_loaded(self):
+        """
+        Return the modules which completed their initialization since our
+        last call, the caller is responsible for registering them.
+        """
+        with self.condition:
+            loaded = list(self.loaded)
+            self.loaded.clear()
+        return loaded
+
+    def start_worker(self):
+        """
+        Start a new worker thread.
+        """
+        worker = Thread(target=self.worker, name='loader-worker')
+        worker.daemon = True
+        worker.start()
+
+    def stop(self):
+        """
+        Wake up the loader and its workers so they notice the lock is
+        cleared.
+        """
+        with self.condition:
+            self.condition.notify_all()
+
+    def worker(self):
+        """
+        Load and instantiate the queued modules one after the other.
+        A worker whose module got abandoned exits when it is done with it
+        since it has been replaced in the meantime.
+        """
+        while True:
+            with self.condition:
+                while not self.jobs and self.lock.is_set():
+                    self.condition.wait()
+                if not self.lock.is_set():
+                    return
+                job = self.jobs.popleft()
+                job['started'] = time()
+                # let the loader watch for this job's timeout
+                self.condition.notify_all()
+
+            module = None
+            try:
+                module = Module(
+                    self.lock,
+                    self.config,
+                    job['module'],
+                    job['user_modules'],
+                    self.py3_wrapper
+                )
+            except Exception:
+                err = sys.exc_info()[1]
+                if not job['abandoned']:
+                    msg = 'loading module "{}" failed ({})'.format(
+                        job['module'],
+                        err
+                    )
+                    self.py3_wrapper.i3_nagbar(msg, level='warning')
+                if module is not None:
+                    module.kill()
+                    module = None
+
+            with self.condition:
+                abandoned = job['abandoned']
+                if not abandoned:
+                    del self.loading[job['module']]
+                    if module is not None:
+                        self.loaded.append(module)
+            if abandoned:
+                if module is not None:
+                    module.kill()
+                return
+            self.py3_wrapper.notify_update()
+
+    def run(self):
+        """
+        Start the workers then give up on the modules which exceed their
+        'init_timeout' while initializing.
+        """
+        for _ in range(self.config['workers']):
+            self.start_worker()
+
+        with self.condition:
+            while self.lock.is_set():
+                now = time()
+                timeout = None
+                for module, job in list(self.loading.items()):
+                    if job['started'] is None:
+                        continue
+                    deadline = job['started'] + job['timeout']
+                    if deadline <= now:
+                        job['abandoned'] = True
+                        del self.loading[module]
+                        msg = 'loading module "{}" timed out after {}s'.format(
+                            module,
+                            job['timeout']
+                        )
+                        self.py3_wrapper.i3_nagbar(msg, level='warning')
+                        # replace the worker stuck with this module
+                        self.start_worker()
+                        self.py3_wrapper.notify_update()
+                    elif timeout is None or deadline - now < timeout:
+                        timeout = deadline - now
+                self.condition.wait(timeout)
+
+
+class Scheduler(Thread):
+    """
+    This class is responsible for running every module when its cache
+    expires. Due modules are kept in a heap sorted on their next run time
+    and are dispatched to a bounded pool of worker threads so that the
+    number of threads and wake ups do not grow with the number of modules.
+
+    The scheduler is also the watchdog of the calls made by its workers: a
+    call exceeding its 'method_timeout' is reported and the output of its
+    method is marked as stale. The stuck worker is abandoned and replaced,
+    it exits once its call returns.
+    """
+    def __init__(self, lock, config, py3_wrapper):
+        """
+        The workers are started along with the scheduler thread.
+        """
+        Thread.__init__(self, name='scheduler')
+        self.condition = Condition()
+        self.config = config
+        self.abandoned = set()
+        self.due = {}
+        self.heap = []
+        self.lock = lock
+        # active policy name: setting giving the factor applied to the
+        # refresh intervals of each module
+        self.multipliers = {}
+        self.overdue = set()
+        self.paused = False
+        self.wakeups_saved = 0
+        self.pending = {}
+        self.py3_wrapper = py3_wrapper
+        self.running = set()
+        self.sequence = 0
+        self.tasks = Queue()
+        self.workers = []
+
+    def schedule(self, module, due):
+        """
+        Set the timestamp at which the given module should be run.
+        If the module is currently running, it will be run again right after
+        if the given timestamp is already due by then.
+        A None timestamp means that the module has nothing to run for now.
+        """
+        if due is None:
+            return
+        with self.condition:
+            try:
+                multiplier = self.get_multiplier(module)
+            except Exception:
+                multiplier = 1
+            now = time()
+            if multiplier != 1 and due > now:
+                due = now + (due - now) * multiplier
+                # one run now stands for this many runs at the normal rate
+                self.wakeups_saved += multiplier - 1
+            name = module.module_full_name
+            if name in self.running:
+                self.pending[name] = min(due, self.pending.get(name, due))
+                return
+            self.due[name] = due
+            self.sequence += 1
+            heappush(self.heap, (due, self.sequence, module))
+            # wake up the scheduler only if this changes its next wake up
+            if self.heap[0][2] is module:
+                self.condition.notify()
+
+    @staticmethod
+    def get_factor(module, setting):
+        """
+        Return the factor the given setting of the given module applies to
+        its refresh interval, Module.check_setting only lets positive
+        factors through.
+        """
+        return module.get_setting(setting)
+
+    def get_multiplier(self, module):
+        """
+        Return the factor applied by our policies to the refresh interval of
+        the given module.
+        """
+        multiplier = 1
+        for setting in list(self.multipliers.values()):
+            multiplier *= self.get_factor(module, setting)
+        return multiplier
+
+    def set_multiplier(self, policy, setting):
+        """
+        Activate the given policy, the refresh interval of each module is
+        multiplied by the given setting of the module, or deactivate it if
+        the setting is None. The modules are then run right away so that
+        those whose cache expired in the meantime are refreshed.
+        """
+        with self.condition:
+            if setting is not None:
+                self.multipliers[policy] = setting
+                return
+            if self.multipliers.pop(policy, None) is None:
+                return
+            # the main thread adds and removes modules meanwhile
+            modules = [
+                module for module in list(self.py3_wrapper.modules.values())
+                if module.module_full_name in self.due
+            ]
+        # the modules whose cache is still fresh are only rescheduled
+        for module in modules:
+            self.schedule(module, time())
+
+    def pause(self, paused):
+        """
+        Stop or continue dispatching modules, the modules which became due
+        while we were paused are run as soon as we continue.
+        """
+        with self.condition:
+            self.paused = paused
+            self.condition.notify()
+
+    def submit(self, job):
+        """
+        Run the given callable on a worker as soon as possible.
+        """
+        self.tasks.put(job)
+        # let the watchdog know about it
+        with self.condition:
+            self.condition.notify()
+
+    def unschedule(self, module):
+        """
+        Stop running the given module, stale heap entries are skipped.
+        """
+        with self.condition:
+            self.due.pop(module.module_full_name, None)
+            self.pending.pop(module.module_full_name, None)
+
+    def done(self, module, due):
+        """
+        Called by a worker when it has finished running the given module.
+        """
+        with self.condition:
+            name = module.module_full_name
+            self.running.discard(name)
+            if name not in self.due:
+                # the module was unscheduled while running
+                self.pending.pop(name, None)
+                return
+            if name in self.pending:
+                pending = self.pending.pop(name)
+                due = pending if due is None else min(due, pending)
+        self.schedule(module, due)
+
+    def worker(self):
+        """
+        Run the modules the scheduler dispatches to us.
+        """
+        while True:
+            module = self.tasks.get()
+            if module is None:
+                break
+            if not isinstance(module, Module):
+                # a job given to submit
+                try:
+                    module()
+                except Exception:
+                    err = sys.exc_info()[1]
+                    self.py3_wrapper.logger.log(
+                        LOG_WARNING, 'job failed ({error})', error=err
+                    )
+            else:
+                try:
+                    due = module.run()
+                except Exception:
+                    err = sys.exc_info()[1]
+                    self.py3_wrapper.logger.log(
+                        LOG_WARNING,
+                        'module {module} failed ({error})',
+                        key=(module.module_full_name, None, str(err)),
+                        error=err,
+                        module=module.module_full_name
+                    )
+                    due = time() + self.config['interval']
+                try:
+                    self.done(module, due)
+                except Exception:
+                    # never leave the module marked as running, it would
+                    # not be dispatched again
+                    err = sys.exc_info()[1]
+                    self.py3_wrapper.logger.log(
+                        LOG_WARNING,
+                        'rescheduling module {module} failed ({error})',
+                        key=(module.module_full_name, 'done', str(err)),
+                        error=err,
+                        module=module.module_full_name
+                    )
+                    with self.condition:
+                        self.running.discard(module.module_full_name)
+
+            # we have been replaced while stuck
+            with self.condition:
+                if get_ident() in self.abandoned:
+                    self.abandoned.discard(get_ident())
+                    self.workers = [
+                        worker for worker in self.workers
+                        if worker.ident != get_ident()
+                    ]
+                    return
+
+    def start_worker(self):
+        """
+        Start a new worker thread.
+        """
+        worker = Thread(target=self.worker, name='scheduler-worker')
+        worker.daemon = True
+        worker.start()
+        self.workers.append(worker)
+
+    def watch(self, now):
+        """
+        Check the deadline of the calls of our workers, return the time in
+        seconds until the next check or None if nothing is being called.
+        """
+        workers = set(worker.ident for worker in self.workers)
+        calling = False
+        for ident, (module, meth, started) in list(Module.calling.items()):
+            # process executors enforce the deadline themselves
+            if ident not in workers or module.executor is not None:
+                continue
+            calling = True
+            if (ident, started) in self.overdue:
+                continue
+            timeout = module.get_setting('method_timeout')
+            if now - started < timeout:
+                continue
+
+            self.overdue.add((ident, started))
+            syslog(
+                LOG_WARNING,
+                'user method {} of module {} overdue after {}s, '
+                'abandoning its worker'.format(
+                    meth,
+                    module.module_full_name,
+                    timeout
+                )
+            )
+            if meth in module.stats:
+                module.stats[meth].overdue += 1
+            if meth in module.methods:
+                module.set_stale(meth)
+            self.abandoned.add(ident)
+            self.start_worker()
+
+        # forget about the calls which completed
+        self.overdue = set(
+            (ident, started) for ident, started in self.overdue
+            if ident in Module.calling and
+            Module.calling[ident][2] == started
+        )
+        if calling or self.running:
+            return 1
+        return None
+
+    def stop(self):
+        """
+        Wake up the scheduler so it notices the lock is cleared.
+        """
+        with self.condition:
+            self.condition.notify()
+
+    def run(self):
+        """
+        Dispatch due modules to the workers then sleep until the next one is
+        due or until a module gets rescheduled.
+        We will execute the 'kill' method of every module when we terminate.
+        """
+        for _ in range(self.config['workers']):
+            self.start_worker()
+
+        with self.condition:
+            while self.lock.is_set():
+                now = time()
+                while not self.paused and self.heap and self.heap[0][0] <= now:
+                    due, _, module = heappop(self.heap)
+                    name = module.module_full_name
+                    # skip outdated entries of rescheduled modules
+                    if self.due.get(name) != due or name in self.running:
+                        continue
+                    self.running.add(name)
+                    self.tasks.put(module)
+                try:
+                    timeout = self.watch(now)
+                except Exception:
+                    # do not let the watchdog take the scheduler down
+                    err = sys.exc_info()[1]
+                    self.py3_wrapper.logger.log(
+                        LOG_WARNING, 'watchdog failed ({error})', error=err
+                    )
+                    timeout = 1
+                if not self.paused and self.heap and (
+                        timeout is None or self.heap[0][0] - now < timeout):
+                    timeout = self.heap[0][0] - now
+                self.condition.wait(timeout)
+
+        # stop the workers and call the modules' kill methods
+        for _ in self.workers:
+            self.tasks.put(None)
+        for module in list(self.py3_wrapper.modules.values()):
+            module.kill()
+
+        # wake up the main loop so it notices we are gone
+        self.py3_wrapper.notify_update()
+
+
+class Profiler(Thread):
+    """
+    This class is a sampling profiler which can be started at runtime for a
+    bounded time window. It periodically samples the stacks of our threads
+    and attributes each sample to the module running in the thread, or
+    whose source the stack goes through, or else to the py3status thread
+    itself ('main' for the main loop).
+    Samples of py3status threads idling while waiting for work are only
+    counted, not profiled.
+    """
+    # modules where our threads block waiting for work
+    idle_modules = (
+        'multiprocessing.connection', 'queue', 'Queue', 'selectors',
+        'threading'
+    )
+
+    def __init__(self, py3_wrapper, target, duration, interval):
+        """
+        Profile the given target ('all', 'main' or a module name) for the
+        given duration, sampling every interval seconds.
+        """
+        Thread.__init__(self, name='profiler')
+        self.daemon = True
+        self.attributions = {}
+        self.duration = duration
+        self.functions = {}
+        self.idle = 0
+        self.idle_codes = set(
+            func.__code__ for func in (
+                IOPoller.readline,
+                ConfigWatcher.watch_inotify,
+                ConfigWatcher.watch_stat,
+                Control.run
+            )
+        )
+        self.interval = interval
+        self.py3_wrapper = py3_wrapper
+        self.report = None
+        self.samples = 0
+        self.started = None
+        self.stopped = Event()
+        self.target = target
+
+    def get_sources(self):
+        """
+        Return a dict of the source files of the loaded modules and the
+        name of their module.
+        """
+        sources = {}
+        for module in list(self.py3_wrapper.modules.values()):
+            if module.loader is None:
+                continue
+            path = module.loader_path(module.loader)
+            sources[os.path.realpath(path)] = module.module_name
+            sources[path] = module.module_name
+        return sources
+
+    def is_idle(self, frame):
+        """
+        Return True if the given top frame is one of a thread waiting.
+        """
+        if frame.f_code in self.idle_codes:
+            return True
+        return frame.f_globals.get('__name__') in self.idle_modules
+
+    def sample(self, sources, names):
+        """
+        Sample the current stacks of all our threads but ourself.
+        """
+        for ident, top_frame in sys._current_frames().items():
+            if ident == self.ident:
+                continue
+
+            # walk the stack from the top frame
+            stack = []
+            attribution = None
+            calling = Module.calling.get(ident)
+            if calling is not None:
+                attribution = calling[0].module_full_name
+            frame = top_frame
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    (code.co_filename, code.co_firstlineno, code.co_name)
+                )
+                if attribution is None and code.co_filename in sources:
+                    attribution = sources[code.co_filename]
+                frame = frame.f_back
+            if attribution is None:
+                # one of our own threads
+                attribution = names.get(ident, 'unknown')
+                if self.is_idle(top_frame):
+                    attribution = None
+
+            if self.target != 'all' and (
+                attribution is None or
+                self.target not in (attribution, attribution.split(' ')[0])
+            ):
+                continue
+            self.samples += 1
+            if attribution is None:
+                self.idle += 1
+                continue
+
+            self.attributions[attribution] = self.attributions.get(
+                attribution, 0
+            ) + 1
+            seen = set()
+            for function in stack:
+                key = (attribution,) + function
+                counts = self.functions.setdefault(key, [0, 0])
+                if not seen:
+                    counts[0] += 1
+                if key not in seen:
+                    seen.add(key)
+                    counts[1] += 1
+
+    def get_report(self):
+        """
+        Return the text report of our samples, the attributions then the
+        functions sorted on their cumulative samples.
+        """
+        elapsed = (time() - self.started) if self.started else 0
+        lines = [
+            'py3status profile of "{}" during {:.1f}s: {} samples every '
+            '{:.0f}ms, {} idle'.format(
+                self.target, elapsed, self.samples, self.interval * 1000,
+                self.idle
+            ),
+            '',
+            '{:>8} {:>6}  {}'.format('samples', 'share', 'attribution')
+        ]
+        busy = max(self.samples - self.idle, 1)
+        for attribution, count in sorted(
+            self.attributions.items(), key=lambda item: -item[1]
+        ):
+            lines.append('{:>8} {:>5.1f}%  {}'.format(
+                count, count * 100.0 / busy, attribution
+            ))
+        lines += [
+            '',
+            '{:>8} {:>8}  {:<20} {}'.format(
+                'self', 'cumul', 'attribution', 'function'
+            )
+        ]
+        functions = sorted(
+            self.functions.items(), key=lambda item: (-item[1][1], item[0])
+        )
+        for (attribution, filename, lineno, name), counts in functions[:50]:
+            lines.append('{:>8} {:>8}  {:<20} {} ({}:{})'.format(
+                counts[0], counts[1], attribution, name, filename, lineno
+            ))
+        return '\n'.join(lines) + '\n'
+
+    def stop(self):
+        """
+        Stop sampling before the end of our time window.
+        """
+        self.stopped.set()
+
+    def run(self):
+        """
+        Sample until the end of our time window or until we are stopped,
+        then write our report.
+        """
+        self.started = time()
+        deadline = self.started + self.duration
+        sources = {}
+        names = {}
+        next_refresh = 0
+        while not self.stopped.is_set() and time() < deadline:
+            # the modules and threads change rarely
+            if time() >= next_refresh:
+                sources = self.get_sources()
+                names = dict(
+                    (thread.ident, thread.name)
+                    for thread in threading_enumerate()
+                )
+                names[self.py3_wrapper.main_ident] = 'main'
+                next_refresh = time() + 1
+            self.sample(sources, names)
+            self.stopped.wait(self.interval)
+        self.report = self.get_report()
+        self.py3_wrapper.profiler_done(self)
+
+
+class PowerPolicy(Thread):
+    """
+    This class watches whether the display is off or locked and stretches
+    the refresh interval of every module by 'power_factor' meanwhile, they
+    are refreshed as soon as the display wakes up.
+
+    The display state is given by the probes listed in 'power_probe':
+        dpms: the monitor state reported by 'xset -q'
+        logind: the LockedHint of our logind session
+        file:<path>: the path contains 'off' or 'locked'
+    It can also be set with the 'power' command of the command line, from
+    the hooks of a screen locker for example.
+    """
+    def __init__(self, lock, config, py3_wrapper):
+        """
+        The display is on until told otherwise.
+        """
+        Thread.__init__(self, name='power')
+        self.daemon = True
+        self.config = config
+        self.idle = False
+        self.lock = lock
+        self.probes = []
+        self.py3_wrapper = py3_wrapper
+        self.state_lock = Lock()
+        for probe in (config['power_probe'] or '').split(','):
+            name, _, arg = probe.strip().partition(':')
+            if name in ('', 'none'):
+                continue
+            method = getattr(self, 'probe_{}'.format(name), None)
+            if method is None:
+                raise ValueError('unknown power probe "{}"'.format(name))
+            self.probes.append((probe, method, arg))
+
+    def probe_dpms(self, arg):
+        """
+        Return True if DPMS turned the monitor off, in standby or suspend.
+        """
+        output = Popen(
+            ['xset', '-q'], stdout=PIPE, stderr=PIPE
+        ).communicate()[0].decode('utf-8', 'replace')
+        match = re.search('Monitor is (.+)', output)
+        return match is not None and match.group(1).strip() != 'On'
+
+    def probe_logind(self, arg):
+        """
+        Return True if logind tells that our session is locked.
+        """
+        session = os.environ.get('XDG_SESSION_ID', 'auto')
+        output = Popen(
+            ['loginctl', 'show-session', session, '-p', 'LockedHint'],
+            stdout=PIPE,
+            stderr=PIPE
+        ).communicate()[0].decode('utf-8', 'replace')
+        return output.strip() == 'LockedHint=yes'
+
+    def probe_file(self, path):
+        """
+        Return True if the given file says the display is off or locked.
+        """
+        try:
+            with open(path) as f:
+                return f.read().strip().lower() in ('locked', 'off')
+        except (IOError, OSError):
+            return False
+
+    def set_idle(self, idle):
+        """
+        Stretch the refresh intervals while the display is off or locked.
+        """
+        with self.state_lock:
+            if idle == self.idle:
+                return
+            if idle:
+                msg = (
+                    'display off or locked, refreshing modules {:g} times '
+                    'less often'
+                ).format(self.config['power_factor'])
+            else:
+                msg = 'display on, refreshing modules at full rate'
+            syslog(LOG_INFO, msg)
+            self.py3_wrapper.scheduler.set_multiplier(
+                'power', 'power_factor' if idle else None
+            )
+            self.idle = idle
+
+    def run(self):
+        """
+        Poll our probes, the display is off or locked if any of them says
+        so. We only act on changes so that the 'power' command holds until
+        the probes change their mind.
+        """
+        last_idle = None
+        while self.lock.is_set():
+            try:
+                idle = False
+                for probe, method, arg in list(self.probes):
+                    try:
+                        idle = method(arg)
+                    except OSError:
+                        err = sys.exc_info()[1]
+                        syslog(
+                            LOG_WARNING,
+                            'disabling power probe {} ({})'.format(probe, err)
+                        )
+                        self.probes.remove((probe, method, arg))
+                        continue
+                    if idle:
+                        break
+                if idle != last_idle:
+                    self.set_idle(idle)
+                    last_idle = idle
+            except Exception:
+                # keep the policy going, we retry on the next poll
+                err = sys.exc_info()[1]
+                self.py3_wrapper.logger.log(
+                    LOG_WARNING, 'power policy failed ({error})', error=err
+                )
+            if not self.probes:
+                break
+            sleep(self.config['power_interval'])
+
+
+class BatteryPolicy(Thread):
+    """
+    This class watches whether we are running on battery and multiplies
+    the refresh interval of every module by its 'battery_factor' meanwhile,
+    a module opts out with a 'battery_factor' of 1. The modules are
+    refreshed as soon as the AC is plugged back in.
+
+    The power supplies are read from /sys/class/power_supply which is where
+    acpi gets them too.
+    """
+    path = '/sys/class/power_supply'
+
+    def __init__(self, lock, config, py3_wrapper):
+        """
+        We start on AC until told otherwise.
+        """
+        Thread.__init__(self, name='battery')
+        self.daemon = True
+        self.config = config
+        self.lock = lock
+        self.on_battery = False
+        self.py3_wrapper = py3_wrapper
+
+    def read(self, supply, name):
+        """
+        Return the given attribute of the given power supply or None.
+        """
+        try:
+            with open(os.path.join(self.path, supply, name)) as f:
+                return f.read().strip()
+        except (IOError, OSError):
+            return None
+
+    def get_supplies(self):
+        """
+        Return the names of the power supplies of this machine.
+        """
+        try:
+            return sorted(os.listdir(self.path))
+        except OSError:
+            return []
+
+    def has_battery(self):
+        """
+        Tell if this machine has a battery at all.
+        """
+        return any(
+            self.read(supply, 'type') == 'Battery'
+            for supply in self.get_supplies()
+        )
+
+    def is_on_battery(self):
+        """
+        Return True if no AC adapter is online and a battery discharges.
+        """
+        discharging = False
+        for supply in self.get_supplies():
+            supply_type = self.read(supply, 'type')
+            if supply_type == 'Mains' and self.read(supply, 'online') == '1':
+                return False
+            if supply_type == 'Battery':
+                discharging |= self.read(supply, 'status') == 'Discharging'
+        return discharging
+
+    def poll(self):
         """
-        try:
-            click_method = getattr(self.module_class, 'on_click')
-            click_method(
-                self.i3status_thread.json_list,
-                self.i3status_thread.config['general'],
-                event
-            )
-        except Exception:
-            err = sys.exc_info()[1]
-            msg = 'on_click failed with ({}) for event ({})'.format(err, event)
-            syslog(LOG_WARNING, msg)
+        Switch the policy if we went on or off battery.
+        """
+        on_battery = self.is_on_battery()
+        if on_battery == self.on_battery:
+            return
+        if on_battery:
+            msg = (
+                'running on battery, refreshing modules {:g} times less often'
+            ).format(self.config['battery_factor'])
+        else:
+            msg = 'running on AC, refreshing modules at full rate'
+        syslog(LOG_INFO, msg)
+        self.py3_wrapper.scheduler.set_multiplier(
+            'battery', 'battery_factor' if on_battery else None
+        )
+        self.on_battery = on_battery
 
-    @profile
     def run(self):
         """
-        On a timely fashion, execute every method found for this module.
-        We will respect and set a cache timeout for each method if the user
-        didn't already do so.
-        We will execute the 'kill' method of the module when we terminate.
+        Poll the power supplies and switch the policy on changes.
         """
         while self.lock.is_set():
-            # execute each method of this module
-            for meth, obj in self.methods.items():
-                my_method = self.methods[meth]
-
-                # always check the lock
-                if not self.lock.is_set():
-                    break
-
-                # respect the cache set for this method
-                if time() < obj['cached_until']:
-                    continue
-
-                try:
-                    # execute method and get its output
-                    method = getattr(self.module_class, meth)
-                    response = method(
-                        self.i3status_thread.json_list,
-                        self.i3status_thread.config['general']
-                    )
-
-                    if isinstance(response, dict):
-                        # this is a shiny new module giving a dict response
-                        position, result = None, response
-                        result['name'] = self.module_name
-                        result['instance'] = self.module_inst
-                    else:
-                        # this is an old school module reporting its position
-                        position, result = response
-                        if not isinstance(position, int):
-                            raise TypeError('position is not an int')
-                        if not isinstance(result, dict):
-                            raise TypeError('response should be a dict')
-                        if 'name' not in result:
-                            raise KeyError('missing "name" key in response')
-
-                    # validate the response
-                    if 'full_text' not in result:
-                        raise KeyError('missing "full_text" key in response')
-
-                    # initialize method object
-                    if my_method['name'] is None:
-                        my_method['name'] = result['name']
-                        if 'instance' in result:
-                            my_method['instance'] = result['instance']
-                        else:
-                            my_method['instance'] = result['name']
-
-                    # update method object cache
-                    if 'cached_until' in result:
-                        cached_until = result['cached_until']
-                    else:
-                        cached_until = time() + self.config['cache_timeout']
-                    my_method['cached_until'] = cached_until
-
-                    # update method object output
-                    my_method['last_output'] = result
-
-                    # update method object position
-                    my_method['position'] = position
-
-                    # debug info
-                    if self.config['debug']:
-                        syslog(
-                            LOG_INFO,
-                            'method {} returned {} '.format(meth, result)
-                        )
-                except Exception:
-                    err = sys.exc_info()[1]
-                    syslog(
-                        LOG_WARNING,
-                        'user method {} failed ({})'.format(meth, err)
-                    )
-
-            # don't be hasty mate, let's take it easy for now
-            sleep(self.config['interval'])
-
-        # check and execute the 'kill' method if present
-        if self.has_kill:
             try:
-                kill_method = getattr(self.module_class, 'kill')
-                kill_method(
-                    self.i3status_thread.json_list,
-                    self.i3status_thread.config['general']
-                )
+                self.poll()
             except Exception:
-                # this would be stupid to die on exit
-                pass
+                # keep the policy going, we retry on the next poll
+                err = sys.exc_info()[1]
+                self.py3_wrapper.logger.log(
+                    LOG_WARNING, 'battery policy failed ({error})', error=err
+                )
+            sleep(self.config['battery_interval'])
 
 
 class Py3statusWrapper():
@@ -1148,8 +3718,25 @@ class Py3statusWrapper():
         """
         self.last_refresh_ts = time()
         self.lock = Event()
+        self.main_ident = get_ident()
+        self.output_lock = Lock()
+        self.output_stats = {'coalesced': 0, 'lines': 0, 'updates': 0}
+        self.profiler = None
         self.modules = {}
         self.py3_modules = []
+        self.async_loop = None
+        self.bar_paused = False
+        self.config_changed = False
+        self.i3status_respawn = None
+        self.refresh_requested = False
+        self.json_fragments = []
+        self.startup_metrics = {}
+        self.state = {}
+        self.state_lock = Lock()
+        self.startup_profile_lock = Lock()
+        self.startup_profiled = None
+        self.startup_ts = time()
+        self.update_event = Event()
 
     def get_config(self):
         """
@@ -1160,9 +3747,30 @@ class Py3statusWrapper():
 
         # defaults
         config = {
+            'battery_factor': 1,
+            'battery_interval': 10,
             'cache_timeout': 60,
             'include_paths': ['{}/.i3/py3status/'.format(home_path)],
-            'interval': 1
+            'executor_max_calls': 0,
+            'executor_max_rss': 256,
+            'init_timeout': 10,
+            'interval': 1,
+            'log_rate': 10,
+            'log_window': 60,
+            'max_rate': 10,
+            'power_factor': 10,
+            'power_interval': 5,
+            'power_probe': None,
+            'method_timeout': 30,
+            'stale_indicator': ' (stale)',
+            'profile_duration': 30,
+            'profile_interval': 0.01,
+            'refresh_jitter': 0.1,
+            'retry_max': 300,
+            'startup_profile': False,
+            'stats_file': None,
+            'stats_interval': 15,
+            'workers': 4
         }
 
         # package version
@@ -1200,6 +3808,13 @@ class Py3statusWrapper():
         parser = argparse.ArgumentParser(
             description='The agile, python-powered, i3status wrapper')
         parser = argparse.ArgumentParser(add_help=True)
+        parser.add_argument('-b', '--battery-factor', action="store",
+                            dest="battery_factor",
+                            type=positive_float,
+                            default=config['battery_factor'],
+                            help="""refresh the modules this many times less
+                            often while on battery (default 1, no
+                            change)""")
         parser.add_argument('-c', '--config', action="store",
                             dest="i3status_conf",
                             type=str,
@@ -1216,8 +3831,36 @@ class Py3statusWrapper():
                             type=float,
                             default=config['interval'],
                             help="update interval in seconds (default 1 sec)")
+        parser.add_argument('-r', '--max-rate', action="store",
+                            dest="max_rate",
+                            type=float,
+                            default=config['max_rate'],
+                            help="""maximum number of bar updates per second,
+                            0 for no limit (default 10)""")
+        parser.add_argument('--power-factor', action="store",
+                            dest="power_factor",
+                            type=positive_float,
+                            default=config['power_factor'],
+                            help="""refresh the modules this many times less
+                            often while the display is off or locked
+                            (default 10)""")
+        parser.add_argument('--power-probe', action="store",
+                            dest="power_probe",
+                            type=str,
+                            help="""comma separated probes telling if the
+                            display is off or locked: dpms, logind or
+                            file:<path> (default none)""")
         parser.add_argument('-s', '--standalone', action="store_true",
                             help="standalone mode, do not use i3status")
+        parser.add_argument('--startup-profile', action="store_true",
+                            dest="startup_profile",
+                            help="""syslog the time spent importing each
+                            module at startup""")
+        parser.add_argument('--stats-file', action="store",
+                            dest="stats_file",
+                            type=str,
+                            help="""write the modules metrics to this file
+                            in the OpenMetrics text format every 15 sec""")
         parser.add_argument('-t', '--timeout', action="store",
                             dest="cache_timeout",
                             type=int,
@@ -1245,12 +3888,18 @@ class Py3statusWrapper():
             sys.exit(0)
 
         # override configuration and helper variables
+        config['battery_factor'] = options.battery_factor
         config['cache_timeout'] = options.cache_timeout
         config['debug'] = options.debug
         if options.include_paths:
             config['include_paths'] = options.include_paths
         config['interval'] = int(options.interval)
+        config['max_rate'] = options.max_rate
+        config['power_factor'] = options.power_factor
+        config['power_probe'] = options.power_probe
         config['standalone'] = options.standalone
+        config['startup_profile'] = options.startup_profile
+        config['stats_file'] = options.stats_file
         config['i3status_config_path'] = options.i3status_conf
 
         # all done
@@ -1293,6 +3942,8 @@ class Py3statusWrapper():
         """
         Load the given modules from the list (contains instance name) with
         respect to the user provided modules dict.
+        The modules are loaded concurrently by the module loader and get
+        registered by the main loop once ready, see register_modules.
 
         modules_list: ['weather_yahoo paris', 'net_rate']
         user_modules: {
@@ -1303,33 +3954,120 @@ class Py3statusWrapper():
             # ignore already provided modules (prevents double inclusion)
             if module in self.modules:
                 continue
-            try:
-                my_m = Module(
-                    self.lock,
-                    self.config,
-                    module,
-                    self.i3status_thread,
-                    user_modules
-                )
-                # only start and handle modules with available methods
-                if my_m.methods:
-                    my_m.start()
-                    self.modules[module] = my_m
-                elif self.config['debug']:
-                    syslog(
-                        LOG_INFO,
-                        'ignoring module "{}" (no methods found)'.format(
-                            module
-                        )
+            self.module_loader.load(
+                module,
+                user_modules,
+                self.i3status_thread.config.get(module, {})
+            )
+
+    def register_modules(self):
+        """
+        Register the modules which completed their initialization to the
+        events thread and the scheduler.
+        """
+        for my_m in self.module_loader.get_loaded():
+            # only schedule and handle modules with available methods
+            if my_m.methods:
+                if any(m['async'] for m in my_m.methods.values()):
+                    self.get_async_loop()
+                self.modules[my_m.module_full_name] = my_m
+                self.events_thread.register_module(my_m)
+                self.scheduler.schedule(my_m, time())
+            elif self.config['debug']:
+                syslog(
+                    LOG_INFO,
+                    'ignoring module "{}" (no methods found)'.format(
+                        my_m.module_full_name
                     )
-            except Exception:
-                err = sys.exc_info()[1]
-                msg = 'loading module "{}" failed ({})'.format(module, err)
-                self.i3_nagbar(msg, level='warning')
+                )
+        self.report_startup_profile()
+
+    def unload_module(self, module_name):
+        """
+        Stop and forget about the given loaded module.
+        """
+        module = self.modules.pop(module_name)
+        self.scheduler.unschedule(module)
+        self.events_thread.unregister_module(module)
+        module.kill()
+        syslog(LOG_INFO, 'unloaded module "{}"'.format(module_name))
+
+    def reload_config(self):
+        """
+        The i3status config file changed, parse it again and apply the
+        differences. i3status is only respawned if its own part of the
+        config changed, we then keep the running one until the new one is
+        ready (see apply_config).
+        """
+        try:
+            i3status_thread = I3status(
+                self.lock,
+                self.config['i3status_config_path'],
+                self.config['standalone'],
+                self
+            )
+        except Exception:
+            err = sys.exc_info()[1]
+            self.i3_nagbar('config reload failed ({})'.format(err))
+            return
+
+        if (
+            not self.config['standalone'] and
+            i3status_thread.config_text != self.i3status_thread.config_text
+        ):
+            syslog(LOG_INFO, 'i3status config changed, respawning i3status')
+            if self.i3status_respawn is not None:
+                self.i3status_respawn.stop()
+            i3status_thread.start()
+            self.i3status_respawn = i3status_thread
+        else:
+            # keep the running i3status and the state of its modules
+            config = i3status_thread.config
+            for section_name in config['i3s_modules'] + ['general']:
+                config[section_name] = self.i3status_thread.config.get(
+                    section_name,
+                    config[section_name]
+                )
+            self.i3status_thread.config = config
+            self.apply_config()
+
+    def apply_config(self):
+        """
+        Make the config of the current i3status thread effective: update the
+        click events configuration then unload the modules which were removed
+        or whose config section changed and load the new ones. The other
+        modules are left untouched and keep their cached output.
+        """
+        config = self.i3status_thread.config
+        self.events_thread.i3s_config = config
+        self.events_thread.on_click = config['on_click']
+        self.py3_modules = config['py3_modules']
+
+        user_modules = self.get_user_modules()
+        if self.py3_modules:
+            modules_list = self.py3_modules
+        else:
+            # legacy behaviour code
+            modules_list = user_modules
+
+        loading = self.module_loader.get_loading()
+        for module_name, module_config in loading.items():
+            if (
+                module_name not in modules_list or
+                module_config != config.get(module_name, {})
+            ):
+                self.module_loader.cancel(module_name)
+        for module_name, module in list(self.modules.items()):
+            if (
+                module_name not in modules_list or
+                module.module_config != config.get(module_name, {})
+            ):
+                self.unload_module(module_name)
+        self.load_modules(modules_list, user_modules)
 
     def setup(self):
         """
-        Setup py3status and spawn i3status/events/modules threads.
+        Setup py3status and spawn i3status/events/scheduler threads.
         """
         # set the Event lock
         self.lock.set()
@@ -1341,6 +4079,10 @@ class Py3statusWrapper():
             self.handle_cli_command(self.config['cli_command'])
             sys.exit()
 
+        # setup the logger thread
+        self.logger = Logger(self.config)
+        self.logger.start()
+
         if self.config['debug']:
             syslog(
                 LOG_INFO,
@@ -1351,17 +4093,15 @@ class Py3statusWrapper():
         self.i3status_thread = I3status(
             self.lock,
             self.config['i3status_config_path'],
-            self.config['standalone']
+            self.config['standalone'],
+            self
         )
         if self.config['standalone']:
             self.i3status_thread.mock()
         else:
+            # we do not wait for i3status to be ready, its modules are
+            # displayed as placeholders until it is
             self.i3status_thread.start()
-            while not self.i3status_thread.ready:
-                if not self.i3status_thread.is_alive():
-                    err = self.i3status_thread.error
-                    raise IOError(err)
-                sleep(0.1)
         if self.config['debug']:
             syslog(
                 LOG_INFO,
@@ -1371,12 +4111,17 @@ class Py3statusWrapper():
                 )
             )
 
+        # setup the output thread
+        self.writer = Writer(self.lock, self)
+        self.writer.start()
+
         # setup input events thread
         self.events_thread = Events(
             self.lock,
             self.config,
             self.modules,
-            self.i3status_thread.config
+            self.i3status_thread.config,
+            self
         )
         self.events_thread.start()
         if self.config['debug']:
@@ -1387,6 +4132,40 @@ class Py3statusWrapper():
             sys.stdout = open('/dev/null', 'w')
             sys.stderr = open('/dev/null', 'w')
 
+        # setup the modules scheduler thread
+        self.scheduler = Scheduler(self.lock, self.config, self)
+        self.scheduler.start()
+        if self.config['debug']:
+            syslog(LOG_INFO, 'scheduler thread started')
+
+        # setup the modules loader thread
+        self.module_loader = ModuleLoader(self.lock, self.config, self)
+        self.module_loader.start()
+        if self.config['debug']:
+            syslog(LOG_INFO, 'module loader thread started')
+
+        # setup the power saving policy
+        self.power_policy = PowerPolicy(self.lock, self.config, self)
+        if self.power_policy.probes:
+            self.power_policy.start()
+
+        # setup the battery saving policy, the modules can set their own
+        # 'battery_factor' so it runs whenever we have a battery
+        self.battery_policy = BatteryPolicy(self.lock, self.config, self)
+        if self.battery_policy.has_battery():
+            self.battery_policy.start()
+
+        # setup the control thread serving the command line
+        self.control = Control(self.lock, self.config, self)
+        self.control.register('power', self.power_command)
+        self.control.register('profile', self.profile_command)
+        self.control.register('refresh', self.refresh_command)
+        self.control.register('stats', self.get_stats)
+        self.control.start()
+
+        # the still fresh outputs of the modules from our previous run
+        self.state = self.load_state()
+
         # get the list of py3status configured modules
         self.py3_modules = self.i3status_thread.config['py3_modules']
 
@@ -1403,6 +4182,476 @@ class Py3statusWrapper():
             # load and spawn user modules threads based on inclusion folders
             self.load_modules(user_modules, user_modules)
 
+        # modules are imported by the module loader
+        self.startup_profiled = False
+
+        # watch the config file to apply its changes live
+        if os.path.isfile(self.config['i3status_config_path']):
+            self.config_watcher = ConfigWatcher(
+                self.lock,
+                self.config['i3status_config_path'],
+                self
+            )
+            self.config_watcher.start()
+
+    def get_state_path(self):
+        """
+        Return the path of the file holding the state of our modules.
+        """
+        return I3status.get_config_cache_path(
+            self.config['i3status_config_path'],
+            kind='state'
+        )
+
+    def load_state(self):
+        """
+        Return the state of the modules saved on our previous run.
+        """
+        try:
+            with open(self.get_state_path()) as f:
+                state = loads(f.read())
+            if state['version'] != STATE_VERSION:
+                return {}
+            return state['modules']
+        except Exception:
+            return {}
+
+    def pop_state(self, module_name):
+        """
+        Return and forget the saved state of the given module if any.
+        """
+        with self.state_lock:
+            return self.state.pop(module_name, None)
+
+    def save_state(self):
+        """
+        Save the state of our modules on disk so that their still fresh
+        outputs are restored on our next start. The saved states of modules
+        which did not get loaded this time are kept while they are fresh.
+        """
+        now = time()
+        with self.state_lock:
+            modules = dict(
+                (name, state) for name, state in self.state.items()
+                if any(
+                    saved['cached_until'] > now
+                    for saved in state['methods'].values()
+                )
+            )
+        for name, module in list(self.modules.items()):
+            state = module.get_state()
+            if state is not None:
+                modules[name] = state
+
+        state_path = self.get_state_path()
+        state = {'modules': modules, 'version': STATE_VERSION}
+        try:
+            if not os.path.isdir(os.path.dirname(state_path)):
+                os.makedirs(os.path.dirname(state_path))
+            # write then rename so that we never leave a partial state file
+            with NamedTemporaryFile(
+                'w', dir=os.path.dirname(state_path), delete=False
+            ) as f:
+                f.write(dumps(state))
+            os.rename(f.name, state_path)
+        except Exception:
+            err = sys.exc_info()[1]
+            syslog(LOG_WARNING, 'unable to save state ({})'.format(err))
+
+    def get_stats(self, args):
+        """
+        Return our modules metrics as a text table or in the OpenMetrics
+        text format when the 'openmetrics' argument is given.
+        """
+        if args[:1] == ['openmetrics']:
+            return self.get_openmetrics()
+        text = '{:<32} {:>7} {:>6} {:>7} {:>6} {:>9} {:>9} {:>9} {:>9}\n'
+        text = text.format(
+            'module/method', 'calls', 'errors', 'overdue', 'cache',
+            'wall(s)', 'cpu(s)', 'avg(ms)', 'last(ms)'
+        )
+        for module_name, module in sorted(list(self.modules.items())):
+            for meth, stats in sorted(module.stats.items()):
+                average = 0.0
+                if stats.calls:
+                    average = stats.wall_time / stats.calls
+                text += (
+                    '{:<32} {:>7} {:>6} {:>7} {:>5.0f}% {:>9.3f} {:>9.3f} '
+                    '{:>9.1f} {:>9.1f}\n'
+                ).format(
+                    '{}/{}'.format(module_name, meth)[:32],
+                    stats.calls,
+                    stats.errors,
+                    stats.overdue,
+                    stats.get_cache_ratio() * 100,
+                    stats.wall_time,
+                    stats.cpu_time,
+                    average * 1000,
+                    (stats.last_duration or 0) * 1000
+                )
+        text += (
+            '\noutput: {lines} lines, {updates} updates, {coalesced} '
+            'coalesced\n'
+        ).format(**self.output_stats)
+        text += (
+            'writer: {written} lines written, {dropped} dropped, '
+            '{blocked:.3f}s blocked\n'
+        ).format(**self.writer.counters)
+        for policy, setting in sorted(self.scheduler.multipliers.items()):
+            factors = {}
+            for module_name, module in list(self.modules.items()):
+                factor = self.scheduler.get_factor(module, setting)
+                factors.setdefault(factor, []).append(module_name)
+            text += '{}: refresh intervals {}\n'.format(
+                policy,
+                ', '.join(
+                    'x{:g} ({})'.format(factor, ', '.join(sorted(names)))
+                    for factor, names in sorted(factors.items())
+                ) or 'x{:g}'.format(self.config[setting])
+            )
+        text += 'scheduler: {:.0f} wakeups saved\n'.format(
+            self.scheduler.wakeups_saved
+        )
+        text += (
+            'log: {written} written, {repeated} repeated, {dropped} '
+            'dropped\n'
+        ).format(**self.logger.counters)
+        return text
+
+    def get_openmetrics(self):
+        """
+        Return our modules metrics in the OpenMetrics text format.
+        """
+        def labels(module_name, meth=None, **extra):
+            items = [('module', module_name)]
+            if meth is not None:
+                items.append(('method', meth))
+            items += sorted(extra.items())
+            return ','.join(
+                '{}="{}"'.format(
+                    key,
+                    value.replace('\\', '\\\\').replace('"', '\\"')
+                    .replace('\n', '\\n')
+                )
+                for key, value in items
+            )
+
+        methods = []
+        for module_name, module in sorted(list(self.modules.items())):
+            for meth, stats in sorted(module.stats.items()):
+                methods.append((module_name, meth, stats))
+
+        lines = []
+        for name, kind, help_text, attr in (
+            ('calls', 'counter', 'Number of calls', 'calls'),
+            ('errors', 'counter', 'Number of failed calls', 'errors'),
+            ('cache_hits', 'counter', 'Number of runs served from cache',
+             'cache_hits'),
+            ('overdue', 'counter', 'Number of calls past their deadline',
+             'overdue'),
+            ('cpu_seconds', 'counter', 'Thread CPU time spent in calls',
+             'cpu_time'),
+            ('last_duration_seconds', 'gauge', 'Duration of the last call',
+             'last_duration'),
+        ):
+            metric = 'py3status_method_{}'.format(name)
+            suffix = '_total' if kind == 'counter' else ''
+            lines.append('# TYPE {} {}'.format(metric, kind))
+            lines.append('# HELP {} {}.'.format(metric, help_text))
+            for module_name, meth, stats in methods:
+                value = getattr(stats, attr)
+                if value is None:
+                    continue
+                lines.append('{}{}{{{}}} {}'.format(
+                    metric, suffix, labels(module_name, meth), value
+                ))
+
+        metric = 'py3status_method_duration_seconds'
+        lines.append('# TYPE {} histogram'.format(metric))
+        lines.append('# HELP {} Wall time of the calls.'.format(metric))
+        for module_name, meth, stats in methods:
+            count = 0
+            bounds = [repr(float(b)) for b in MethodStats.buckets] + ['+Inf']
+            for bound, value in zip(bounds, stats.histogram):
+                count += value
+                lines.append('{}_bucket{{{}}} {}'.format(
+                    metric, labels(module_name, meth, le=bound), count
+                ))
+            lines.append('{}_sum{{{}}} {}'.format(
+                metric, labels(module_name, meth), stats.wall_time
+            ))
+            lines.append('{}_count{{{}}} {}'.format(
+                metric, labels(module_name, meth), stats.calls
+            ))
+
+        for name, help_text in (
+            ('lines', 'Number of lines printed to i3bar'),
+            ('updates', 'Number of updates notified to the main loop'),
+            ('coalesced', 'Number of updates coalesced into another line'),
+        ):
+            metric = 'py3status_output_{}'.format(name)
+            lines.append('# TYPE {} counter'.format(metric))
+            lines.append('# HELP {} {}.'.format(metric, help_text))
+            lines.append('{}_total {}'.format(
+                metric, self.output_stats[name]
+            ))
+
+        for name, help_text in (
+            ('written', 'Number of lines written to i3bar'),
+            ('dropped', 'Number of lines superseded before being written'),
+            ('blocked', 'Time spent waiting for i3bar to read'),
+        ):
+            metric = 'py3status_writer_{}'.format(name)
+            if name == 'blocked':
+                metric += '_seconds'
+            lines.append('# TYPE {} counter'.format(metric))
+            lines.append('# HELP {} {}.'.format(metric, help_text))
+            lines.append('{}_total {}'.format(
+                metric, self.writer.counters[name]
+            ))
+
+        for name, help_text in (
+            ('written', 'Number of lines written to syslog'),
+            ('repeated', 'Number of log messages aggregated as repeats'),
+            ('dropped', 'Number of log messages dropped by the limits'),
+        ):
+            metric = 'py3status_log_{}'.format(name)
+            lines.append('# TYPE {} counter'.format(metric))
+            lines.append('# HELP {} {}.'.format(metric, help_text))
+            lines.append('{}_total {}'.format(
+                metric, self.logger.counters[name]
+            ))
+
+        metric = 'py3status_scheduler_multiplier'
+        lines.append('# TYPE {} gauge'.format(metric))
+        lines.append('# HELP {} {}.'.format(
+            metric, 'Factor applied to the refresh intervals of a module by '
+            'a policy'
+        ))
+        for policy, setting in sorted(self.scheduler.multipliers.items()):
+            for module_name, module in sorted(list(self.modules.items())):
+                lines.append('{}{{{}}} {}'.format(
+                    metric,
+                    labels(module_name, policy=policy),
+                    self.scheduler.get_factor(module, setting)
+                ))
+
+        metric = 'py3status_scheduler_wakeups_saved'
+        lines.append('# TYPE {} counter'.format(metric))
+        lines.append('# HELP {} {}.'.format(
+            metric, 'Estimated number of module runs saved by the policies'
+        ))
+        lines.append('{}_total {}'.format(
+            metric, self.scheduler.wakeups_saved
+        ))
+
+        for name, help_text in (
+            ('first_paint', 'Time from start to the first bar display'),
+            ('complete', 'Time from start to the complete bar display'),
+        ):
+            if name not in self.startup_metrics:
+                continue
+            metric = 'py3status_startup_{}_seconds'.format(name)
+            lines.append('# TYPE {} gauge'.format(metric))
+            lines.append('# HELP {} {}.'.format(metric, help_text))
+            lines.append('{} {}'.format(metric, self.startup_metrics[name]))
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def get_profile_path(self):
+        """
+        Return the path of the report file of our profiler.
+        """
+        return os.path.join(
+            os.path.dirname(self.get_state_path()),
+            'profile-{}.txt'.format(os.getpid())
+        )
+
+    def start_profiler(self, target, duration):
+        """
+        Profile the given target for the given duration in seconds, see the
+        Profiler class.
+        """
+        if self.profiler is not None and self.profiler.is_alive():
+            raise RuntimeError('already profiling "{}"'.format(
+                self.profiler.target
+            ))
+        duration = min(max(duration, 1), 600)
+        self.profiler = Profiler(
+            self,
+            target,
+            duration,
+            self.config['profile_interval']
+        )
+        self.profiler.start()
+        syslog(
+            LOG_INFO,
+            'profiling "{}" for {}s'.format(target, duration)
+        )
+
+    def profiler_done(self, profiler):
+        """
+        Called by the profiler when it completed, save its report.
+        """
+        profile_path = self.get_profile_path()
+        try:
+            if not os.path.isdir(os.path.dirname(profile_path)):
+                os.makedirs(os.path.dirname(profile_path))
+            with open(profile_path, 'w') as f:
+                f.write(profiler.report)
+            syslog(LOG_INFO, 'profile written to {}'.format(profile_path))
+        except Exception:
+            err = sys.exc_info()[1]
+            syslog(LOG_WARNING, 'unable to write profile ({})'.format(err))
+
+    def power_command(self, args):
+        """
+        Handle the 'power' command of the command line:
+            power off: the display is off or locked
+            power on: the display is on
+            power: tell the display state
+        """
+        action = args[0] if args else 'status'
+        if action in ('off', 'on'):
+            self.power_policy.set_idle(action == 'off')
+        elif action != 'status':
+            raise ValueError('unknown power action "{}"'.format(action))
+        if self.power_policy.idle:
+            return (
+                'display off, refreshing modules {:g} times less often\n'
+            ).format(self.config['power_factor'])
+        return 'display on\n'
+
+    def profile_command(self, args):
+        """
+        Handle the 'profile' command of the command line:
+            profile start [target] [seconds]: start profiling the given
+                module, 'main' for the main loop or 'all' (default)
+            profile stop: stop profiling and return the report
+            profile report: return the report of the last profile
+            profile: tell if we are profiling
+        """
+        profiler = self.profiler
+        action = args[0] if args else 'status'
+        if action == 'start':
+            target = args[1] if len(args) > 1 else 'all'
+            if target not in ('all', 'main') and not any(
+                target in (name, name.split(' ')[0])
+                for name in list(self.modules)
+            ):
+                raise ValueError('unknown module "{}"'.format(target))
+            if len(args) > 2:
+                duration = float(args[2])
+            else:
+                duration = self.config['profile_duration']
+            self.start_profiler(target, duration)
+            return 'profiling "{}" for {}s, report in {}\n'.format(
+                target,
+                self.profiler.duration,
+                self.get_profile_path()
+            )
+        elif action == 'stop':
+            if profiler is None or not profiler.is_alive():
+                raise RuntimeError('not profiling')
+            profiler.stop()
+            profiler.join()
+            return profiler.report
+        elif action == 'report':
+            if profiler is None or profiler.report is None:
+                raise RuntimeError('no profile report available')
+            return profiler.report
+        elif action == 'status':
+            if profiler is None or not profiler.is_alive():
+                return 'not profiling\n'
+            return 'profiling "{}" for {:.0f}s more\n'.format(
+                profiler.target,
+                profiler.started + profiler.duration - time()
+            )
+        raise ValueError('unknown profile action "{}"'.format(action))
+
+    def toggle_profiler(self, signum, frame):
+        """
+        SIGUSR2 was received, start profiling everything for the default
+        duration or stop the running profiler.
+        """
+        if self.profiler is not None and self.profiler.is_alive():
+            self.profiler.stop()
+        else:
+            try:
+                self.start_profiler('all', self.config['profile_duration'])
+            except Exception:
+                err = sys.exc_info()[1]
+                syslog(LOG_WARNING, 'unable to profile ({})'.format(err))
+
+    def startup_pending(self):
+        """
+        Return True while i3status or a module did not give its first output.
+        """
+        if not self.i3status_thread.ready:
+            return True
+        if not self.module_loader.is_idle():
+            return True
+        return any(module.is_pending() for module in self.modules.values())
+
+    def record_startup_metrics(self):
+        """
+        Record the time it took from our start to the first display of the
+        bar and to its complete display, without placeholders.
+        """
+        elapsed = time() - self.startup_ts
+        if 'first_paint' not in self.startup_metrics:
+            self.startup_metrics['first_paint'] = elapsed
+        if not self.startup_pending():
+            self.startup_metrics['complete'] = elapsed
+            syslog(
+                LOG_INFO,
+                'startup: first paint after {:.1f}ms, '
+                'complete bar after {:.1f}ms'.format(
+                    self.startup_metrics['first_paint'] * 1000,
+                    elapsed * 1000
+                )
+            )
+
+    def report_startup_profile(self):
+        """
+        When asked to with --startup-profile, syslog the time spent
+        importing and instantiating each module once all of them are
+        loaded, slowest first.
+        """
+        if not self.config['startup_profile']:
+            return
+        if self.startup_profiled is not False:
+            return
+        if not self.module_loader.is_idle():
+            return
+        with self.startup_profile_lock:
+            modules = list(self.modules.values())
+            if self.startup_profiled is not False:
+                return
+            if any(module.import_time is None for module in modules):
+                return
+            self.startup_profiled = True
+
+        modules.sort(key=lambda module: module.import_time, reverse=True)
+        for module in modules:
+            syslog(
+                LOG_INFO,
+                'startup profile: module "{}" import {:.1f}ms ({})'.format(
+                    module.module_full_name,
+                    module.import_time * 1000,
+                    module.import_mode
+                )
+            )
+        syslog(
+            LOG_INFO,
+            'startup profile: {} modules imported in {:.1f}ms, '
+            'all ready {:.1f}ms after start'.format(
+                len(modules),
+                sum(module.import_time for module in modules) * 1000,
+                (time() - self.startup_ts) * 1000
+            )
+        )
+
     def i3_nagbar(self, msg, level='error'):
         """
         Make use of i3-nagbar to display errors and warnings to the user.
@@ -1421,48 +4670,133 @@ class Py3statusWrapper():
         except:
             pass
 
+    def get_async_loop(self):
+        """
+        Return the event loop thread shared by coroutine methods, it is only
+        started when the first coroutine method is run.
+        """
+        if self.async_loop is None:
+            self.async_loop = AsyncLoop()
+            self.async_loop.start()
+        return self.async_loop
+
+    def notify_update(self):
+        """
+        Tell the main loop that something changed and that the output
+        should be evaluated again. This is thread safe.
+        """
+        with self.output_lock:
+            self.output_stats['updates'] += 1
+        self.update_event.set()
+
     def stop(self):
         """
         Clear the Event lock, this will break all threads' loops.
         """
         try:
             self.lock.clear()
+            self.notify_update()
+            if hasattr(self, 'scheduler'):
+                self.scheduler.stop()
+            if hasattr(self, 'control'):
+                self.control.stop()
+            if hasattr(self, 'writer'):
+                self.writer.stop()
+            if hasattr(self, 'module_loader'):
+                self.module_loader.stop()
+                self.save_state()
             if self.config['debug']:
                 syslog(LOG_INFO, 'lock cleared, exiting')
+            self.logger.stop()
             self.i3status_thread.cleanup_tmpfile()
         except:
             pass
 
     def sig_handler(self, signum, frame):
         """
-        SIGUSR1 was received, the user asks for an immediate refresh of the bar
-        so we force i3status to refresh by sending it a SIGUSR1
-        and we clear all py3status modules' cache.
+        SIGUSR1 was received, the user asks for an immediate refresh of the
+        bar. The handler may interrupt the main loop while it holds a lock so
+        it only asks the main loop to refresh, see refresh_all_modules.
+        """
+        self.refresh_requested = True
+        self.update_event.set()
+
+    def refresh_all_modules(self):
+        """
+        Force i3status to refresh by sending it a SIGUSR1 and clear all
+        py3status modules' cache.
 
         To prevent abuse, we rate limit this function to 100ms.
         """
         if time() > (self.last_refresh_ts + 0.1):
             syslog(LOG_INFO, 'received USR1, forcing refresh')
 
-            # send SIGUSR1 to i3status
-            call(['killall', '-s', 'USR1', 'i3status'])
-
-            # clear the cache of all modules
-            self.clear_modules_cache()
-
-            # reset the refresh timestamp
-            self.last_refresh_ts = time()
+            # refresh i3status and clear the cache of all modules
+            self.refresh_modules()
         else:
             syslog(
                 LOG_INFO,
                 'received USR1 but rate limit is in effect, calm down'
             )
 
+    def refresh_modules(self, module_names=None):
+        """
+        Force a refresh of the given modules, or of all of them if none is
+        given, and return the names of the refreshed ones.
+        A module name without instance refreshes all its instances.
+        i3status is refreshed through a SIGUSR1 sent to its process only,
+        we rate limit this to 100ms.
+        """
+        i3s_modules = self.i3status_thread.config['i3s_modules']
+        refreshed = []
+        refresh_i3status = module_names is None
+        if module_names is None:
+            self.clear_modules_cache()
+            refreshed = sorted(list(self.modules))
+            if not self.config['standalone']:
+                refreshed.append('i3status')
+        else:
+            for module_name in module_names:
+                found = False
+                for name, module in list(self.modules.items()):
+                    if module_name in (name, module.module_name):
+                        module.clear_cache()
+                        refreshed.append(name)
+                        found = True
+                if not found and (
+                    module_name in i3s_modules or
+                    module_name in self.i3status_thread.i3status_module_names
+                ):
+                    refresh_i3status = True
+                    refreshed.append(module_name)
+
+        if refresh_i3status and time() > (self.last_refresh_ts + 0.1):
+            self.i3status_thread.refresh()
+            self.last_refresh_ts = time()
+        return refreshed
+
+    def refresh_command(self, args):
+        """
+        Handle the 'refresh' command of the command line:
+            refresh [module...]: refresh the given modules or all of them
+        """
+        refreshed = self.refresh_modules(args or None)
+        unknown = [
+            name for name in args
+            if name not in refreshed and not any(
+                r.split(' ')[0] == name for r in refreshed
+            )
+        ]
+        if unknown:
+            raise ValueError('unknown module {}'.format(', '.join(unknown)))
+        return 'refreshed {}\n'.format(', '.join(refreshed) or 'nothing')
+
     def clear_modules_cache(self):
         """
         For every module, reset the 'cached_until' of all its methods.
         """
-        for module in self.modules.values():
+        # we may be called from the control thread
+        for module in list(self.modules.values()):
             module.clear_cache()
 
     def get_modules_output(self, json_list):
@@ -1528,21 +4862,66 @@ class Py3statusWrapper():
 
         # log the final ordering in debug mode
         if self.config['debug']:
-            syslog(
+            self.logger.log(
                 LOG_INFO,
-                'ordering result {}'.format([m['name'] for m in m_list])
+                'ordering result {names}',
+                names=[m['name'] for m in m_list]
             )
 
         # return the ordered result
         return m_list
 
+    def encode_output(self, json_list):
+        """
+        Return the given output list encoded as a compact JSON array.
+        The encoded fragment of each block is cached along with the block at
+        its position in the output so that we only re-encode the blocks which
+        changed since the last call. Blocks are never modified once output
+        so an unchanged block is usually the very same object.
+        """
+        fragments = []
+        cache = []
+        for index, block in enumerate(json_list):
+            if index < len(self.json_fragments) and (
+                self.json_fragments[index][0] is block or
+                self.json_fragments[index][0] == block
+            ):
+                cached = self.json_fragments[index]
+            else:
+                cached = (block, dumps(block, separators=(',', ':')))
+            cache.append(cached)
+            fragments.append(cached[1])
+        self.json_fragments = cache
+        return '[{}]'.format(','.join(fragments))
+
+    def bar_signal(self, signum, frame):
+        """
+        i3bar sends us its stop_signal when it is hidden and its cont_signal
+        when it is shown again, the main loop pauses or resumes accordingly.
+        """
+        self.bar_paused = signum == SIGTSTP
+        self.update_event.set()
+
+    def pause(self, paused):
+        """
+        Pause or resume everything which updates the bar: the scheduler and
+        the i3status processes.
+        """
+        syslog(
+            LOG_INFO,
+            'i3bar {}'.format('stopped, pausing' if paused else 'continued')
+        )
+        self.scheduler.pause(paused)
+        self.i3status_thread.pause(paused)
+        if self.i3status_respawn is not None:
+            self.i3status_respawn.pause(paused)
+
     def terminate(self, signum, frame):
         """
         Received request to terminate (SIGTERM), exit nicely.
         """
         raise KeyboardInterrupt()
 
-    @profile
     def run(self):
         """
         Main py3status loop, continuously read from i3status and modules
@@ -1551,15 +4930,93 @@ class Py3statusWrapper():
         # SIGUSR1 forces a refresh of the bar both for py3status and i3status,
         # this mimics the USR1 signal handling of i3status (see man i3status)
         signal(SIGUSR1, self.sig_handler)
+        signal(SIGUSR2, self.toggle_profiler)
         signal(SIGTERM, self.terminate)
+        # i3bar sends these when it is hidden and shown again
+        signal(SIGTSTP, self.bar_signal)
+        signal(SIGCONT, self.bar_signal)
 
         # initialize usage variables
-        delta = 0
-        last_delta = -1
-        previous_json_list = []
+        interval = max(self.config['interval'], 1)
+        next_tick = time()
+        previous_output = None
+        frame = 0
+        if self.config['max_rate'] > 0:
+            frame = 1.0 / self.config['max_rate']
+        last_line_ts = 0
+        paused = False
+        updates = 0
+
+        # start the i3bar protocol right away, the bar is then displayed
+        # progressively as i3status and the modules give their first output
+        header = {
+            'click_events': True,
+            'cont_signal': int(SIGCONT),
+            'stop_signal': int(SIGTSTP),
+            'version': 1
+        }
+        self.writer.write_header(dumps(header, sort_keys=True))
+        self.writer.write_header('[')
 
         # main loop
         while True:
+            # sleep until a thread notifies us of a change or until the time
+            # modules are due for their next tick, this keeps an idle bar
+            # from waking up for nothing
+            timeout = MAX_WAIT
+            if self.i3status_thread.has_time_modules() and not paused:
+                timeout = min(max(next_tick - time(), 0), MAX_WAIT)
+            self.update_event.wait(timeout)
+            if paused:
+                self.update_event.clear()
+
+            # the bar is hidden, nothing is updated nor printed until it is
+            # shown again, then the modules whose cache expired are run and
+            # the bar is printed
+            if self.bar_paused != paused:
+                paused = self.bar_paused
+                self.pause(paused)
+                if not paused:
+                    next_tick = time()
+                    previous_output = None
+            if paused:
+                continue
+
+            # cap our output rate: the updates notified during the current
+            # frame are coalesced into the next line we print
+            delay = last_line_ts + frame - time()
+            if delay > 0:
+                sleep(delay)
+            self.update_event.clear()
+            with self.output_lock:
+                pending = self.output_stats['updates'] - updates
+                updates = self.output_stats['updates']
+
+            # apply config file changes
+            if self.config_changed:
+                self.config_changed = False
+                self.reload_config()
+
+            # refresh everything on SIGUSR1
+            if self.refresh_requested:
+                self.refresh_requested = False
+                self.refresh_all_modules()
+
+            # register the modules which completed their initialization
+            self.register_modules()
+
+            # switch to the respawned i3status once it is ready
+            if self.i3status_respawn is not None:
+                if self.i3status_respawn.ready:
+                    self.i3status_thread.stop()
+                    self.i3status_thread = self.i3status_respawn
+                    self.i3status_respawn = None
+                    self.apply_config()
+                elif not self.i3status_respawn.is_alive():
+                    err = self.i3status_respawn.error
+                    self.i3status_respawn = None
+                    self.i3_nagbar('i3status respawn failed ({})'.format(err))
+
             # check i3status thread
             if not self.i3status_thread.is_alive():
                 err = self.i3status_thread.error
@@ -1568,6 +5025,14 @@ class Py3statusWrapper():
                 self.i3_nagbar(err)
                 break
 
+            # check our output, there is no one to show it to anymore
+            if not self.writer.is_alive():
+                syslog(
+                    LOG_ERR,
+                    'unable to write to i3bar ({})'.format(self.writer.error)
+                )
+                break
+
             # check events thread
             if not self.events_thread.is_alive():
                 # don't spam the user with i3-nagbar warnings
@@ -1576,66 +5041,55 @@ class Py3statusWrapper():
                     err = 'events thread died, click events are disabled'
                     self.i3_nagbar(err, level='warning')
 
-            # check that every module thread is alive
-            for module in self.modules.values():
-                if not module.is_alive():
-                    # don't spam the user with i3-nagbar warnings
-                    if not hasattr(module, 'i3_nagbar'):
-                        module.i3_nagbar = True
-                        msg = 'output frozen for dead module(s) {}'.format(
-                            ','.join(module.methods.keys())
-                        )
-                        self.i3_nagbar(msg, level='warning')
+            # check the scheduler thread
+            if not self.scheduler.is_alive():
+                # don't spam the user with i3-nagbar warnings
+                if not hasattr(self.scheduler, 'i3_nagbar'):
+                    self.scheduler.i3_nagbar = True
+                    err = 'scheduler thread died, output of modules is frozen'
+                    self.i3_nagbar(err, level='warning')
 
             # get output from i3status
-            prefix = self.i3status_thread.last_prefix
-            json_list = deepcopy(self.i3status_thread.json_list)
+            json_list = self.i3status_thread.json_list
+            if json_list is None:
+                # i3status is not ready yet
+                json_list = []
 
             # transform time and tztime outputs from i3status
             # every configured interval seconds
-            if (
-                self.config['interval'] <= 1 or (
-                    int(delta) % self.config['interval'] == 0
-                    and int(last_delta) != int(delta)
-                )
-            ):
-                delta = 0
-                last_delta = 0
-                json_list = self.i3status_thread.tick_time_modules(
-                    json_list,
-                    force=True
-                )
-            else:
+            now = time()
+            if self.i3status_thread.ready:
+                force = now >= next_tick
+                if force:
+                    next_tick = now - (now % interval) + interval
                 json_list = self.i3status_thread.tick_time_modules(
                     json_list,
-                    force=False
+                    force=force
                 )
 
             # construct the global output
-            if self.modules:
-                if self.py3_modules:
-                    # new style i3status configured ordering
-                    json_list = self.i3status_thread.get_modules_output(
-                        json_list,
-                        self.modules
-                    )
-                else:
-                    # old style ordering
-                    json_list = self.get_modules_output(json_list)
+            if self.py3_modules:
+                # new style i3status configured ordering
+                json_list = self.i3status_thread.get_modules_output(
+                    json_list,
+                    self.modules,
+                    self.module_loader.get_loading()
+                )
+            elif self.modules:
+                # old style ordering
+                json_list = self.get_modules_output(json_list)
 
             # dump the line to stdout only on change
-            if json_list != previous_json_list:
-                print_line('{}{}'.format(prefix, dumps(json_list)))
-
-            # remember the last json list output
-            previous_json_list = deepcopy(json_list)
-
-            # reset i3status json_list and json_list_ts
-            self.i3status_thread.update_json_list()
-
-            # sleep a bit before doing this again to avoid killing the CPU
-            delta += 0.1
-            sleep(0.1)
+            output = self.encode_output(json_list)
+            if output != previous_output:
+                self.writer.write_line(output)
+                previous_output = output
+                last_line_ts = time()
+                with self.output_lock:
+                    self.output_stats['lines'] += 1
+                    self.output_stats['coalesced'] += max(pending - 1, 0)
+                if 'complete' not in self.startup_metrics:
+                    self.record_startup_metrics()
 
     @staticmethod
     def print_module_description(details, mod_name, mod_path):
@@ -1688,6 +5142,16 @@ class Py3statusWrapper():
         elif cmd[:2] in (['modules', 'enable'], ['modules', 'disable']):
             # TODO: to be implemented
             pass
+        elif cmd[0] in ['power', 'profile', 'refresh', 'stats']:
+            # ask the running py3status instances
+            responses = Control.send_command(cmd)
+            if not responses:
+                print_stderr('Error: no running py3status found')
+                sys.exit(1)
+            for pid, response in responses:
+                if len(responses) > 1:
+                    print('# py3status pid {}'.format(pid))
+                sys.stdout.write(response)
         else:
             print_stderr('Error: unknown command')
             sys.exit(1)
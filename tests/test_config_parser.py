@@ -0,0 +1,179 @@
+"""
+Tests of the i3status configuration parser.
+
+The expected configs are the ones parsed by the former eval based parser,
+except for trailing comments which it kept in unquoted values.
+"""
+from threading import Lock
+
+import pytest
+
+from py3status import I3status
+
+
+PLAIN_CONFIG = """
+general {
+    colors = true
+    interval = 5
+}
+
+order += "ipv6"
+order += "disk /"
+order += "run_watch DHCP"
+order += "wireless wlan0"
+order += "battery 0"
+order += "load"
+order += "tztime local"
+order += "weather_yahoo paris"
+
+ipv6 { format_up = "%ip" }
+
+wireless wlan0 {
+    format_up = "W: (%quality at %essid) %ip"
+    format_down = "W: down"
+}
+
+run_watch DHCP {
+    pidfile = "/var/run/dhclient*.pid"
+}
+
+battery 0 {
+    format = "%status %percentage %remaining"
+}
+
+disk "/" {
+    format = "%free"
+}
+
+load {
+    format = "%1min"
+}
+
+tztime local {
+    format = "%Y-%m-%d %H:%M:%S %Z"
+}
+
+weather_yahoo paris {
+    cache_timeout = 1800
+    city_code = "FRXX0076"
+    on_click 1 = "exec firefox"
+    on_click 3 = "refresh"
+}
+"""
+
+COMMENTED_CONFIG = """
+# i3status configuration file
+general {
+    colors = true # use colors
+    interval = 5 # seconds
+    color_good = #00FF00
+    color_bad = "#FF0000" # red
+}
+
+order += "disk /" # root fs
+order += "load"
+order += "time"
+order += "static_string"
+
+disk "/" {
+    format = "%avail" # free space
+}
+
+load {
+    format = "%1min"
+}
+
+time {
+    format = %Y-%m-%d %H:%M:%S
+}
+
+static_string {
+    format = 'hello # not a comment'
+    on_click 1 = "exec i3-sensible-terminal" # open a terminal
+}
+"""
+
+GENERAL = {
+    'color_bad': '#FF0000',
+    'color_degraded': '#FFFF00',
+    'color_good': '#00FF00',
+    'color_separator': '#333333',
+    'colors': 'true',
+    'interval': 5,
+    'output_format': 'i3bar'
+}
+
+
+@pytest.fixture
+def parse(tmpdir, monkeypatch):
+    """
+    Return a function parsing the given config text as py3status does.
+    """
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmpdir.join('cache')))
+
+    def parse(text):
+        path = tmpdir.join('i3status.conf')
+        path.write(text)
+        return I3status(Lock(), str(path), False, None)
+    return parse
+
+
+def test_plain_config(parse):
+    config = parse(PLAIN_CONFIG).config
+    assert config == {
+        'battery 0': {'format': '%status %percentage %remaining'},
+        'disk /': {'format': '%free'},
+        'general': GENERAL,
+        'i3s_modules': [
+            'ipv6', 'disk /', 'run_watch DHCP', 'wireless wlan0',
+            'battery 0', 'load', 'tztime local'
+        ],
+        'ipv6': {'format_up': '%ip'},
+        'load': {'format': '%1min'},
+        'on_click': {
+            'weather_yahoo paris': {1: 'exec firefox', 3: 'refresh'}
+        },
+        'order': [
+            'ipv6', 'disk /', 'run_watch DHCP', 'wireless wlan0',
+            'battery 0', 'load', 'tztime local', 'weather_yahoo paris'
+        ],
+        'py3_modules': ['weather_yahoo paris'],
+        'run_watch DHCP': {'pidfile': '/var/run/dhclient*.pid'},
+        'tztime local': {'format': '%Y-%m-%d %H:%M:%S %Z'},
+        'weather_yahoo paris': {
+            'cache_timeout': 1800,
+            'city_code': 'FRXX0076'
+        },
+        'wireless wlan0': {
+            'format_down': 'W: down',
+            'format_up': 'W: (%quality at %essid) %ip'
+        }
+    }
+
+
+def test_trailing_comments(parse):
+    config = parse(COMMENTED_CONFIG).config
+    assert config == {
+        'disk /': {'format': '%avail'},
+        'general': GENERAL,
+        'i3s_modules': ['disk /', 'load', 'time'],
+        'load': {'format': '%1min'},
+        'on_click': {'static_string': {1: 'exec i3-sensible-terminal'}},
+        'order': ['disk /', 'load', 'time', 'static_string'],
+        'py3_modules': ['static_string'],
+        'static_string': {'format': 'hello # not a comment'},
+        'time': {'format': '%Y-%m-%d %H:%M:%S'}
+    }
+
+
+def test_trailing_comments_not_passed_to_i3status(parse):
+    config_text = parse(COMMENTED_CONFIG).config_text
+    assert '#' not in config_text.replace('"#', '')
+    assert 'format = "%avail"\n' in config_text
+    assert 'order += "disk /"\n' in config_text
+
+
+def test_cached_config(parse):
+    first = parse(COMMENTED_CONFIG).config
+    # the second parse is read from the cache
+    assert parse(COMMENTED_CONFIG).config == first
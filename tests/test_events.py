@@ -0,0 +1,187 @@
+"""
+Tests of the dispatching of the i3bar click events to the modules.
+"""
+import json
+import os
+import sys
+import time
+
+from threading import Event
+
+import pytest
+
+from py3status import Events
+
+
+class Logger:
+    """
+    Keep the logged messages.
+    """
+    def __init__(self):
+        self.messages = []
+
+    def log(self, level, msg, key=None, **kwargs):
+        self.messages.append(msg.format(**kwargs))
+
+
+class Scheduler:
+    """
+    Keep the jobs submitted to the workers until we run them.
+    """
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, job):
+        self.jobs.append(job)
+
+    def run_jobs(self):
+        jobs, self.jobs = self.jobs, []
+        for job in jobs:
+            job()
+
+
+class Wrapper:
+    """
+    The parts of Py3statusWrapper used by the events thread.
+    """
+    def __init__(self):
+        self.logger = Logger()
+        self.refreshed = []
+        self.scheduler = Scheduler()
+
+    def notify_update(self):
+        pass
+
+    def refresh_modules(self, module_names=None):
+        self.refreshed.append(module_names)
+
+
+class FakeModule:
+    """
+    A loaded module whose methods reported the given name and instance.
+    """
+    def __init__(self, full_name, methods, click_events=True):
+        self.click_events = click_events
+        self.clicks = []
+        self.module_full_name = full_name
+        self.module_name = full_name.split(' ')[0]
+        self.module_inst = ''.join(full_name.split(' ')[1:])
+        self.methods = {}
+        for method in methods:
+            self.methods[method] = {
+                'instance': self.module_inst or self.module_name,
+                'method': method,
+                'name': self.module_name
+            }
+
+    def click_event(self, event):
+        self.clicks.append(event)
+
+
+def wait_for(condition, timeout=2):
+    """
+    Wait until the given condition is true, fail after the given timeout.
+    """
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def events(monkeypatch):
+    """
+    Return an events thread reading its events from a pipe, use its 'send'
+    attribute to send it an event.
+    """
+    read_fd, write_fd = os.pipe()
+    monkeypatch.setattr(sys, 'stdin', os.fdopen(read_fd, 'rb'))
+    lock = Event()
+    lock.set()
+    events = Events(
+        lock,
+        {'debug': False},
+        {},
+        {'on_click': {'c': {3: 'refresh_all'}}},
+        Wrapper()
+    )
+
+    def send(**event):
+        os.write(write_fd, ',{}\n'.format(json.dumps(event)).encode('utf-8'))
+    events.send = send
+    yield events
+    lock.clear()
+    os.close(write_fd)
+    if events.is_alive():
+        events.join(2)
+
+
+def test_register(events):
+    a = FakeModule('a first', ['z_method', 'b_method'])
+    events.register_module(a)
+    # only the first method of a module gets the events
+    assert events.click_index[('a', 'first')] == [(a, a.methods['b_method'])]
+
+    # every module reporting the same name and instance gets them
+    other = FakeModule('a first', ['method'])
+    events.register_module(other)
+    assert len(events.click_index[('a', 'first')]) == 2
+    assert len(events.click_names['a']) == 2
+
+    events.unregister_module(a)
+    assert events.click_index[('a', 'first')] == [
+        (other, other.methods['method'])
+    ]
+    events.unregister_module(other)
+    assert not events.click_index
+    assert not events.click_names
+
+
+def test_dispatch(events):
+    a = FakeModule('a first', ['method'])
+    b = FakeModule('b', ['method'], click_events=False)
+    for module in (a, b):
+        events.register_module(module)
+    events.start()
+    wrapper = events.py3_wrapper
+
+    # the on_click of a module is run by a scheduler worker
+    events.send(name='a', instance='first', button=1)
+    wait_for(lambda: wrapper.scheduler.jobs)
+    wrapper.scheduler.run_jobs()
+    assert [click['button'] for click in a.clicks] == [1]
+    assert wrapper.refreshed == [['a first']]
+
+    # modules without on_click are refreshed by a middle click
+    events.send(name='b', instance='b', button=1)
+    events.send(name='b', instance='b', button=2)
+    wait_for(lambda: len(wrapper.refreshed) == 2)
+    assert wrapper.refreshed[-1] == ['b']
+    assert not wrapper.scheduler.jobs
+
+    # configured on_click commands
+    events.send(name='c', button=3)
+    wait_for(lambda: len(wrapper.refreshed) == 3)
+    assert wrapper.refreshed[-1] is None
+
+
+def test_click_in_flight(events):
+    a = FakeModule('a', ['method'])
+    events.register_module(a)
+    events.start()
+    wrapper = events.py3_wrapper
+
+    # a module gets a single click at a time
+    events.send(name='a', instance='a', button=1)
+    events.send(name='a', instance='a', button=3)
+    wait_for(lambda: wrapper.logger.messages)
+    assert len(wrapper.scheduler.jobs) == 1
+    assert wrapper.logger.messages[0].startswith(
+        'module a on_click still running, ignoring event'
+    )
+
+    wrapper.scheduler.run_jobs()
+    events.send(name='a', instance='a', button=4)
+    wait_for(lambda: wrapper.scheduler.jobs)
+    wrapper.scheduler.run_jobs()
+    assert [click['button'] for click in a.clicks] == [1, 4]
@@ -0,0 +1,98 @@
+"""
+Tests of the aggregation and rate limiting of the Logger thread.
+"""
+from syslog import LOG_WARNING
+
+import pytest
+
+import py3status
+
+from py3status import Logger
+
+
+@pytest.fixture
+def written(monkeypatch):
+    """
+    Return the list of the lines the logger writes to syslog.
+    """
+    lines = []
+    monkeypatch.setattr(
+        py3status, 'syslog', lambda level, text: lines.append(text)
+    )
+    return lines
+
+
+def make_logger(log_rate=10, log_window=60):
+    return Logger({'log_rate': log_rate, 'log_window': log_window})
+
+
+def test_format(written):
+    logger = make_logger()
+    logger.handle(LOG_WARNING, 'module {module} failed', None, {'module': 'a'})
+    logger.handle(LOG_WARNING, 'no {fields}', None, {})
+    assert written == ['module a failed', 'no {fields}']
+
+
+def test_repeats_are_aggregated(written):
+    logger = make_logger()
+    for error in ('timeout', 'timeout', 'refused'):
+        logger.handle(
+            LOG_WARNING, 'module a failed ({error})', 'a', {'error': error}
+        )
+    assert written == ['module a failed (timeout)']
+    assert logger.counters['repeated'] == 2
+
+    # the repeats are reported with the last text at the end of the window
+    now = py3status.time()
+    assert logger.flush(now) == pytest.approx(60, abs=1)
+    logger.flush(now + 61)
+    assert written[1:] == [
+        'module a failed (refused) (repeated 2 times in 60s)'
+    ]
+
+    # a new window starts
+    logger.handle(LOG_WARNING, 'module a failed again', 'a', {})
+    assert written[-1] == 'module a failed again'
+
+
+def test_no_window(written):
+    logger = make_logger(log_window=0)
+    for _ in range(3):
+        logger.handle(LOG_WARNING, 'same', None, {})
+    assert written == ['same'] * 3
+
+
+def test_rate_limit(written):
+    logger = make_logger(log_rate=2)
+    for i in range(15):
+        logger.handle(LOG_WARNING, 'message {i}', None, {'i': i})
+
+    # bursts of 5 seconds worth of lines are allowed
+    assert len(written) == 10
+    assert logger.counters['dropped'] == 5
+
+    # the dropped messages are reported, bypassing the rate limit
+    logger.flush(py3status.time())
+    assert written[-1] == 'dropped 5 log messages'
+    assert logger.counters['written'] == 11
+
+
+def test_full_queue():
+    logger = make_logger()
+    for i in range(300):
+        logger.log(LOG_WARNING, 'message {i}', i=i)
+    assert logger.queue.qsize() == 256
+    assert logger.counters['dropped'] == 44
+
+
+def test_thread(written):
+    logger = make_logger()
+    logger.start()
+    logger.log(LOG_WARNING, 'module {module} failed', key='a', module='a')
+    logger.log(LOG_WARNING, 'module {module} failed', key='a', module='a')
+    logger.stop()
+    assert not logger.is_alive()
+    # the pending repeats are reported when we stop
+    assert written == [
+        'module a failed', 'module a failed (repeated 1 times in 60s)'
+    ]
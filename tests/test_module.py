@@ -0,0 +1,165 @@
+"""
+Tests of the failure backoff of the module methods.
+"""
+from threading import Event
+
+import pytest
+
+from py3status import Module
+
+
+CONFIG = {
+    'cache_timeout': 60,
+    'debug': False,
+    'interval': 1,
+    'method_timeout': 30,
+    'refresh_jitter': 0,
+    'retry_max': 300,
+    'stale_indicator': ' (stale)'
+}
+
+# the frozen current time
+NOW = 1000.0
+
+SOURCE = '''
+class Py3status:
+    errors = 0
+
+    def status(self, i3s_output_list, i3s_config):
+        if self.errors:
+            self.errors -= 1
+            raise RuntimeError('broken')
+        return {'full_text': 'ok', 'cached_until': 0}
+'''
+
+
+class Logger:
+    """
+    Keep the logged messages.
+    """
+    def __init__(self):
+        self.messages = []
+
+    def log(self, level, msg, key=None, **kwargs):
+        self.messages.append(msg.format(**kwargs))
+
+
+class Events:
+    """
+    Ignore the methods registered for click events.
+    """
+    def register_method(self, module, obj):
+        pass
+
+
+class I3status:
+    """
+    The module config sections of the i3status thread.
+    """
+    def __init__(self, config):
+        self.config = config
+
+    def get_json_list(self):
+        return []
+
+
+class Wrapper:
+    """
+    The parts of Py3statusWrapper used by the modules.
+    """
+    def __init__(self, **config):
+        self.config = dict(CONFIG, **config)
+        self.events_thread = Events()
+        self.i3status_thread = None
+        self.logger = Logger()
+        self.nagbar = []
+
+    def i3_nagbar(self, msg, level='error'):
+        self.nagbar.append(msg)
+
+    def notify_update(self):
+        pass
+
+    def pop_state(self, module_name):
+        return None
+
+
+@pytest.fixture
+def lock():
+    lock = Event()
+    lock.set()
+    yield lock
+    lock.clear()
+
+
+def make_module(tmpdir, lock, wrapper, **module_config):
+    """
+    Return a module running our test source with the given config section.
+    """
+    tmpdir.join('flaky.py').write(SOURCE)
+    wrapper.i3status_thread = I3status(
+        {'flaky': module_config, 'general': {}}
+    )
+    return Module(
+        lock,
+        wrapper.config,
+        'flaky',
+        {'flaky': ('{}/'.format(tmpdir), 'flaky.py')},
+        wrapper
+    )
+
+
+def retry_delays(module, runs):
+    """
+    Run the given module the given number of times as if its cache just
+    expired and return the delays until the next run of its method.
+    """
+    delays = []
+    method = module.methods['status']
+    for _ in range(runs):
+        method['cached_until'] = 0
+        module.run()
+        delays.append(method['cached_until'] - NOW)
+    return delays
+
+
+def test_backoff(tmpdir, lock, monkeypatch):
+    wrapper = Wrapper(retry_max=10)
+    module = make_module(tmpdir, lock, wrapper, errors=6)
+    method = module.methods['status']
+    monkeypatch.setattr('py3status.time', lambda: NOW)
+
+    # the retry delay doubles with each failure up to retry_max
+    delays = retry_delays(module, 6)
+    assert delays == [1, 2, 4, 8, 10, 10]
+    assert method['failures'] == 6
+    assert wrapper.logger.messages[-1] == (
+        'user method status of module flaky failed (broken), '
+        '6 in a row, retrying in 10.0s'
+    )
+
+    # a success resets the backoff
+    method['cached_until'] = 0
+    module.run()
+    assert method['failures'] == 0
+    assert method['last_output']['full_text'] == 'ok'
+
+
+def test_backoff_setting(tmpdir, lock, monkeypatch):
+    wrapper = Wrapper()
+    module = make_module(tmpdir, lock, wrapper, errors=3, retry_max='1.5')
+    monkeypatch.setattr('py3status.time', lambda: NOW)
+    assert retry_delays(module, 3) == [1, 1.5, 1.5]
+    assert not wrapper.nagbar
+
+
+def test_backoff_jitter(tmpdir, lock, monkeypatch):
+    wrapper = Wrapper(refresh_jitter=0.5)
+    module = make_module(tmpdir, lock, wrapper, errors=50)
+    monkeypatch.setattr('py3status.time', lambda: NOW)
+
+    # the retries are spread over the last half of their delay
+    delays = retry_delays(module, 50)
+    assert 0.5 <= delays[0] <= 1
+    assert all(150 <= delay <= 300 for delay in delays[9:])
+    assert len(set(delays[9:])) > 1
@@ -0,0 +1,263 @@
+"""
+Tests of the power and battery policies and of the refresh interval
+multiplier they apply through the scheduler.
+
+The display state is faked with the 'file' probe or with stand-ins of the
+xset and loginctl commands, the power supplies with a fake sysfs tree.
+"""
+import os
+import stat
+import time
+
+from threading import Event
+
+import pytest
+
+from py3status import BatteryPolicy, Module, PowerPolicy, Scheduler
+
+
+CONFIG = {
+    'battery_factor': 3,
+    'battery_interval': 0.01,
+    'interval': 1,
+    'power_factor': 4,
+    'power_interval': 0.01,
+    'power_probe': None
+}
+
+
+class Logger:
+    """
+    Keep the logged messages.
+    """
+    def __init__(self):
+        self.messages = []
+
+    def log(self, level, msg, **kwargs):
+        self.messages.append(msg.format(**kwargs))
+
+
+class Wrapper:
+    """
+    The parts of Py3statusWrapper used by the policies and the scheduler.
+    """
+    def __init__(self, **config):
+        self.config = dict(CONFIG, **config)
+        self.logger = Logger()
+        self.modules = {}
+        self.nagbar = []
+        self.scheduler = Scheduler(Event(), self.config, self)
+
+    def i3_nagbar(self, msg, level='error'):
+        self.nagbar.append(msg)
+
+    def notify_update(self):
+        pass
+
+    def add_module(self, name, **settings):
+        """
+        Add a module with the given settings in its i3status config section
+        and schedule it in 10 seconds.
+        """
+        module = Module.__new__(Module)
+        module.config = self.config
+        module.module_class = None
+        module.module_config = settings
+        module.module_full_name = name
+        module.py3_wrapper = self
+        self.modules[name] = module
+        self.scheduler.schedule(module, time.time() + 10)
+        return module
+
+
+@pytest.fixture
+def lock():
+    lock = Event()
+    lock.set()
+    yield lock
+    lock.clear()
+
+
+def wait_for(condition, timeout=2):
+    """
+    Wait until the given condition is true, fail after the given timeout.
+    """
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def fake_command(tmpdir, monkeypatch, name, output):
+    """
+    Install a command printing the given output first in the PATH.
+    """
+    path = tmpdir.join(name)
+    path.write('#!/bin/sh\ncat <<EOF\n{}\nEOF\n'.format(output))
+    path.chmod(stat.S_IRWXU)
+    monkeypatch.setenv(
+        'PATH', '{}{}{}'.format(tmpdir, os.pathsep, os.environ['PATH'])
+    )
+
+
+def test_power_file_probe(tmpdir, lock):
+    display = tmpdir.join('display')
+    display.write('on')
+    wrapper = Wrapper(power_probe='file:{}'.format(display))
+    default = wrapper.add_module('default')
+    fast = wrapper.add_module('fast', power_factor=1)
+    fractional = wrapper.add_module('fractional', power_factor='2.5')
+    policy = PowerPolicy(lock, wrapper.config, wrapper)
+    policy.start()
+    scheduler = wrapper.scheduler
+
+    wait_for(lambda: policy.probes and not policy.idle)
+    assert scheduler.get_multiplier(default) == 1
+
+    display.write('locked')
+    wait_for(lambda: policy.idle)
+    assert scheduler.get_multiplier(default) == 4
+    assert scheduler.get_multiplier(fast) == 1
+    assert scheduler.get_multiplier(fractional) == 2.5
+
+    # the refresh intervals are stretched from now on
+    now = time.time()
+    scheduler.schedule(default, now + 10)
+    assert scheduler.due['default'] == pytest.approx(now + 40, abs=1)
+
+    # waking up the display refreshes the modules right away
+    display.write('on')
+    wait_for(lambda: not policy.idle)
+    assert scheduler.get_multiplier(default) == 1
+    assert scheduler.due['default'] <= time.time()
+
+
+def test_power_logind_probe(tmpdir, monkeypatch, lock):
+    wrapper = Wrapper(power_probe='logind')
+    policy = PowerPolicy(lock, wrapper.config, wrapper)
+    fake_command(tmpdir, monkeypatch, 'loginctl', 'LockedHint=yes')
+    assert policy.probe_logind('')
+    fake_command(tmpdir, monkeypatch, 'loginctl', 'LockedHint=no')
+    assert not policy.probe_logind('')
+
+
+def test_power_dpms_probe(tmpdir, monkeypatch, lock):
+    wrapper = Wrapper(power_probe='dpms')
+    policy = PowerPolicy(lock, wrapper.config, wrapper)
+    fake_command(
+        tmpdir, monkeypatch, 'xset', 'DPMS is Enabled\n  Monitor is Off'
+    )
+    assert policy.probe_dpms('')
+    fake_command(
+        tmpdir, monkeypatch, 'xset', 'DPMS is Enabled\n  Monitor is On'
+    )
+    assert not policy.probe_dpms('')
+
+
+def test_unknown_power_probe(lock):
+    wrapper = Wrapper(power_probe='sonar')
+    with pytest.raises(ValueError):
+        PowerPolicy(lock, wrapper.config, wrapper)
+
+
+def test_invalid_power_factor(lock):
+    wrapper = Wrapper()
+    null = wrapper.add_module('null factor', power_factor=0)
+    negative = wrapper.add_module('negative factor', power_factor=-2)
+    text = wrapper.add_module('text factor', power_factor='fast')
+    policy = PowerPolicy(lock, wrapper.config, wrapper)
+    policy.set_idle(True)
+
+    # invalid factors fall back to the default one, with a single warning
+    for module in (null, negative, text):
+        assert wrapper.scheduler.get_multiplier(module) == 4
+        assert wrapper.scheduler.get_multiplier(module) == 4
+    assert len(wrapper.nagbar) == 3
+    assert 'null factor' in wrapper.nagbar[0]
+
+
+@pytest.fixture
+def supplies(tmpdir, monkeypatch):
+    """
+    Return a function setting the state of our fake power supplies.
+    """
+    monkeypatch.setattr(BatteryPolicy, 'path', str(tmpdir))
+
+    def set_supplies(online, status='Discharging'):
+        tmpdir.ensure('AC', dir=True)
+        tmpdir.join('AC', 'type').write('Mains\n')
+        tmpdir.join('AC', 'online').write('{}\n'.format(online))
+        tmpdir.ensure('BAT0', dir=True)
+        tmpdir.join('BAT0', 'type').write('Battery\n')
+        tmpdir.join('BAT0', 'status').write('{}\n'.format(status))
+    return set_supplies
+
+
+def test_battery_policy(supplies, lock):
+    supplies(online=1, status='Charging')
+    wrapper = Wrapper()
+    default = wrapper.add_module('default')
+    opt_out = wrapper.add_module('opt out', battery_factor=1)
+    policy = BatteryPolicy(lock, wrapper.config, wrapper)
+    scheduler = wrapper.scheduler
+    assert policy.has_battery()
+
+    policy.poll()
+    assert not policy.on_battery
+    assert scheduler.get_multiplier(default) == 1
+
+    supplies(online=0)
+    policy.poll()
+    assert policy.on_battery
+    assert scheduler.get_multiplier(default) == 3
+    assert scheduler.get_multiplier(opt_out) == 1
+
+    supplies(online=1, status='Charging')
+    policy.poll()
+    assert not policy.on_battery
+    assert scheduler.get_multiplier(default) == 1
+    assert scheduler.due['default'] <= time.time()
+
+
+def test_no_battery(tmpdir, monkeypatch):
+    monkeypatch.setattr(BatteryPolicy, 'path', str(tmpdir.join('missing')))
+    wrapper = Wrapper()
+    policy = BatteryPolicy(None, wrapper.config, wrapper)
+    assert not policy.has_battery()
+    assert not policy.is_on_battery()
+
+
+def test_policies_combine(supplies, lock):
+    supplies(online=0)
+    wrapper = Wrapper()
+    module = wrapper.add_module('module', battery_factor='1.5')
+    PowerPolicy(lock, wrapper.config, wrapper).set_idle(True)
+    BatteryPolicy(lock, wrapper.config, wrapper).poll()
+    assert wrapper.scheduler.get_multiplier(module) == 6
+
+
+def test_battery_policy_survives_errors(supplies, lock, monkeypatch):
+    supplies(online=0)
+    wrapper = Wrapper()
+    module = wrapper.add_module('module')
+    set_multiplier = wrapper.scheduler.set_multiplier
+    failures = []
+
+    def flaky_set_multiplier(policy, setting):
+        if not failures:
+            failures.append(policy)
+            raise RuntimeError('dictionary changed size during iteration')
+        set_multiplier(policy, setting)
+
+    monkeypatch.setattr(
+        wrapper.scheduler, 'set_multiplier', flaky_set_multiplier
+    )
+    policy = BatteryPolicy(lock, wrapper.config, wrapper)
+    policy.start()
+
+    # the failed switch is attempted again on the next poll
+    wait_for(lambda: policy.on_battery)
+    assert wrapper.scheduler.get_multiplier(module) == 3
+    assert wrapper.logger.messages == [
+        'battery policy failed (dictionary changed size during iteration)'
+    ]
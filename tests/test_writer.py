@@ -0,0 +1,107 @@
+"""
+Tests of the Writer thread which writes our output to i3bar.
+"""
+import os
+import time
+
+from threading import Event
+
+import pytest
+
+from py3status import Writer
+
+
+class Wrapper:
+    """
+    Count the wake ups of the main loop.
+    """
+    def __init__(self):
+        self.updates = 0
+
+    def notify_update(self):
+        self.updates += 1
+
+
+def wait_for(condition, timeout=2):
+    """
+    Wait until the given condition is true, fail after the given timeout.
+    """
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def writer():
+    """
+    Return a started writer whose output goes to a pipe, the read end of
+    the pipe is its 'output' attribute.
+    """
+    lock = Event()
+    lock.set()
+    read_fd, write_fd = os.pipe()
+    writer = Writer(lock, Wrapper())
+    writer.fd = write_fd
+    writer.output = read_fd
+    writer.start()
+    yield writer
+    lock.clear()
+    writer.stop()
+    writer.join(2)
+    for fd in (read_fd, write_fd):
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+
+def read_lines(fd, count):
+    """
+    Read the given number of lines from the given file descriptor.
+    """
+    data = b''
+    while data.count(b'\n') < count:
+        data += os.read(fd, 65536)
+    return data.decode('utf-8').splitlines()
+
+
+def test_protocol(writer):
+    writer.write_header('{"version": 1}')
+    writer.write_header('[')
+    writer.write_line('[{"full_text":"a"}]')
+    assert read_lines(writer.output, 3) == [
+        '{"version": 1}', '[', '[{"full_text":"a"}]'
+    ]
+    writer.write_line('[{"full_text":"b"}]')
+    assert read_lines(writer.output, 1) == [',[{"full_text":"b"}]']
+    assert writer.counters['written'] == 2
+
+
+def test_backpressure(writer):
+    # a line which does not fit in the pipe until i3bar reads it
+    big = '[{{"full_text":"{}"}}]'.format('x' * 200000)
+    writer.write_line(big)
+    wait_for(lambda: writer.line is None)
+
+    # we never block meanwhile, only the latest line is kept
+    start = time.time()
+    for i in range(100):
+        writer.write_line('[{{"full_text":"{}"}}]'.format(i))
+    assert time.time() - start < 0.5
+    assert writer.counters['dropped'] == 99
+
+    lines = read_lines(writer.output, 2)
+    assert lines == [big, ',[{"full_text":"99"}]']
+    assert writer.counters['written'] == 2
+    assert writer.counters['blocked'] > 0
+
+
+def test_reader_gone(writer):
+    os.close(writer.output)
+    writer.write_line('[]')
+    writer.join(2)
+    assert not writer.is_alive()
+    assert writer.error is not None
+    # the main loop is told so that it exits
+    assert writer.py3_wrapper.updates == 1